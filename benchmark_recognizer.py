@@ -0,0 +1,173 @@
+# latency benchmark of recognizer.py: python benchmark_recognizer.py [--output results.json] [--compare baseline.json]
+import os, sys, json, math, time, random, argparse, platform
+
+import numpy as np
+
+from training_data import load_point_strokes
+from recognizer import Config, Matcher, Point, Recogniser
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class BenchmarkConfig:
+  TEST_PATH = os.path.join(SCRIPT_DIR, "dataset/test")
+  TRAIN_PATH = os.path.join(SCRIPT_DIR, "dataset/train")
+  #number of templates (each add_template adds the stroke and its mirror)
+  TEMPLATE_COUNTS = [10, 64, 256, 1024, 4096]
+  STROKE_LENGTHS = [16, 64, 256, 1024]
+  SAMPLE_POINTS = [32, 64, 128]
+  #template count of the stroke length and SAMPLE_POINTS cases
+  TEMPLATES = 256
+  REPEAT = 3
+  SEED = 42
+  #a result is a regression if its p50 or p95 is more than THRESHOLD slower than the baseline
+  THRESHOLD = 0.10
+
+
+def _with_length(points: list[Point], n: int) -> list[Point]:
+  '''
+    the stroke with n points, linearly interpolated over the index of its points.
+  '''
+  index = np.linspace(0, len(points) - 1, n)
+  xs = np.interp(index, np.arange(len(points)), [p.x for p in points])
+  ys = np.interp(index, np.arange(len(points)), [p.y for p in points])
+
+  return [Point(x, y) for (x, y) in zip(xs.tolist(), ys.tolist())]
+
+def _synthetic(strokes: list[tuple[str, list[Point]]], count: int, rng: random.Random) -> list[tuple[str, list[Point]]]:
+  '''
+    count strokes for a template set. the strokes are used as they are first; beyond that, randomly rotated, scaled and jittered copies are added so that template sets larger than the dataset can be measured.
+  '''
+  result = list(strokes[:count])
+
+  while len(result) < count:
+    name, points = strokes[len(result) % len(strokes)]
+    angle = rng.uniform(-0.3, 0.3)
+    scale = rng.uniform(0.8, 1.2)
+    sin, cos = math.sin(angle), math.cos(angle)
+
+    result.append((name, [Point(scale * (p.x * cos - p.y * sin) + rng.gauss(0, 1), scale * (p.x * sin + p.y * cos) + rng.gauss(0, 1)) for p in points]))
+
+  return result
+
+def _summary(operation: str, samples: list[float], **parameters) -> dict:
+  p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+  #every parameter is part of the name, so that compare only pairs results of the same configuration
+  name = "/".join([operation] + [f"{key}={value}" for (key, value) in parameters.items() if value is not None])
+
+  return {"name": name, **parameters, "count": len(samples), "mean": float(np.mean(samples)), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+def _build(templates: list[tuple[str, list[Point]]], matcher: str) -> tuple[Recogniser, list[float]]:
+  '''
+    a recogniser with the given templates and the latency of every add_template call.
+  '''
+  r = Recogniser(use_predefined_templates=False, matcher=matcher)
+  samples = []
+
+  for (name, points) in templates:
+    t1 = time.perf_counter()
+    r.add_template(name, points)
+    samples.append(time.perf_counter() - t1)
+
+  return (r, samples)
+
+def _measure_recognise(r: Recogniser, queries: list[list[Point]], repeat: int) -> list[float]:
+  r.recognise(queries[0]) #warm up caches and lazy imports
+  samples = []
+
+  for _ in range(repeat):
+    for points in queries:
+      t1 = time.perf_counter()
+      r.recognise(points)
+      samples.append(time.perf_counter() - t1)
+
+  return samples
+
+def run(matcher: str=Matcher.GOLDEN_SECTION, repeat: int=BenchmarkConfig.REPEAT) -> list[dict]:
+  rng = random.Random(BenchmarkConfig.SEED)
+  queries = [points for (_, points) in load_point_strokes(BenchmarkConfig.TEST_PATH)]
+  train = load_point_strokes(BenchmarkConfig.TRAIN_PATH)
+  #shuffled so that small template sets cover most classes instead of the first ones in alphabetical order
+  rng.shuffle(train)
+
+  results = []
+  sample_points = Config.SAMPLE_POINTS
+
+  try:
+    for n in BenchmarkConfig.SAMPLE_POINTS:
+      Config.SAMPLE_POINTS = n
+
+      for count in BenchmarkConfig.TEMPLATE_COUNTS if n == sample_points else [BenchmarkConfig.TEMPLATES]:
+        r, samples = _build(_synthetic(train, count // 2, rng), matcher)
+        parameters = {"matcher": matcher, "templates": len(r.templates), "sample_points": n}
+
+        results.append(_summary("add_template", samples, **parameters))
+        results.append(_summary("recognise", _measure_recognise(r, queries, repeat), **parameters, points=None))
+
+        if n != sample_points or len(r.templates) != BenchmarkConfig.TEMPLATES:
+          continue
+
+        for length in BenchmarkConfig.STROKE_LENGTHS:
+          samples = _measure_recognise(r, [_with_length(points, length) for points in queries], repeat)
+          results.append(_summary("recognise", samples, **parameters, points=length))
+  finally:
+    Config.SAMPLE_POINTS = sample_points
+
+  return results
+
+def compare(results: list[dict], baseline: list[dict], threshold: float=BenchmarkConfig.THRESHOLD) -> tuple[list[str], list[str]]:
+  '''
+    returns a line for every result whose p50 or p95 is more than threshold slower than the result with the same name in the baseline, and a line for every result without a baseline and every baseline without a result.
+  '''
+  previous = {result["name"]: result for result in baseline}
+  names = {result["name"] for result in results}
+  regressions = []
+  unmatched = [f"{name}: not in the results" for name in previous if name not in names]
+
+  for result in results:
+    if result["name"] not in previous:
+      unmatched.append(f"{result['name']}: not in the baseline")
+      continue
+
+    for key in ("p50", "p95"):
+      ratio = result[key] / previous[result["name"]][key]
+
+      if ratio > 1.0 + threshold:
+        regressions.append(f"{result['name']} {key}: {previous[result['name']][key] * 1000:.3f}ms -> {result[key] * 1000:.3f}ms ({ratio - 1.0:+.1%})")
+
+  return (regressions, unmatched)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="latency benchmark of recognizer.py")
+  parser.add_argument("--matcher", default=Matcher.GOLDEN_SECTION, choices=[Matcher.GOLDEN_SECTION, Matcher.PROTRACTOR])
+  parser.add_argument("--repeat", type=int, default=BenchmarkConfig.REPEAT)
+  parser.add_argument("--output", help="write the results as json")
+  parser.add_argument("--compare", help="json file of an earlier run; exits with 1 if a result regressed or has no counterpart")
+  parser.add_argument("--threshold", type=float, default=BenchmarkConfig.THRESHOLD)
+  args = parser.parse_args()
+
+  results = run(args.matcher, args.repeat)
+
+  for result in results:
+    print(f"{result['name']:<80} p50 {result['p50'] * 1000:8.3f}ms  p95 {result['p95'] * 1000:8.3f}ms  p99 {result['p99'] * 1000:8.3f}ms")
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump({
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+      }, f, indent=2)
+
+  if args.compare is not None:
+    with open(args.compare) as f:
+      regressions, unmatched = compare(results, json.load(f)["results"], args.threshold)
+
+    for line in regressions:
+      print(f"REGRESSION {line}")
+
+    #a baseline of another matcher or configuration does not compare anything
+    for line in unmatched:
+      print(f"UNMATCHED {line}")
+
+    sys.exit(1 if len(regressions) + len(unmatched) > 0 else 0)
@@ -0,0 +1,141 @@
+# selects a small set of representative $1 templates per class from dataset/train: python condense_templates.py [--method kmeans|cnn] [--templates N | --latency MS] [--output templates.npz]
+import os, time, argparse
+
+import numpy as np
+
+from training_data import load_point_strokes
+from recognizer import Point, Recogniser
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class CondenseConfig:
+  TRAIN_PATH = os.path.join(SCRIPT_DIR, "dataset/train")
+  TEST_PATH = os.path.join(SCRIPT_DIR, "dataset/test")
+  OUTPUT_PATH = os.path.join(SCRIPT_DIR, "condensed_templates.npz")
+  #templates per class of the kmeans curve
+  CLUSTERS = [1, 2, 3, 4, 6, 8, 12, 16]
+  #condensed nearest neighbour stops after this many passes over the training set
+  MAX_PASSES = 20
+  SEED = 42
+
+class Method:
+  KMEANS = "kmeans" #medoids of a k-means clustering of each class
+  CNN = "cnn" #condensed nearest neighbour: misclassified strokes become templates
+
+
+def _build(strokes: list[tuple[str, list[Point]]], selection: np.ndarray) -> Recogniser:
+  r = Recogniser(use_predefined_templates=False)
+
+  for key in selection:
+    r.add_template(*strokes[key])
+
+  return r
+
+def _evaluate(r: Recogniser, test: list[tuple[str, list[Point]]]) -> tuple[float, float]:
+  '''
+    accuracy on the test strokes and the median latency of recognise.
+  '''
+  labels = np.array([name for (name, _) in test], dtype=object)
+  _, names, _ = r.recognise_many([points for (_, points) in test])
+
+  samples = []
+  for (_, points) in test:
+    t1 = time.perf_counter()
+    r.recognise(points)
+    samples.append(time.perf_counter() - t1)
+
+  return (float(np.mean(names == labels)), float(np.median(samples)))
+
+def _kmeans(strokes: list[tuple[str, list[Point]]], converted: np.ndarray, valid: np.ndarray, k: int) -> np.ndarray:
+  '''
+    per class, the strokes closest to the centres of a k-means clustering of their converted points.
+  '''
+  #scikit-learn is only needed for this method
+  from sklearn.cluster import KMeans
+
+  labels = np.array([name for (name, _) in strokes], dtype=object)
+  selection = []
+
+  for label in np.unique(labels[valid]):
+    members = valid[labels[valid] == label]
+    x = converted[members].reshape(len(members), -1)
+    kmeans = KMeans(n_clusters=min(k, len(members)), n_init=10, random_state=CondenseConfig.SEED).fit(x)
+
+    for (cluster, centre) in enumerate(kmeans.cluster_centers_):
+      inside = np.flatnonzero(kmeans.labels_ == cluster)
+      selection.append(members[inside[np.argmin(np.linalg.norm(x[inside] - centre, axis=1))]])
+
+  return np.array(sorted(selection), dtype=int)
+
+def _condensed_nearest_neighbour(strokes: list[tuple[str, list[Point]]], valid: np.ndarray, max_templates: int=None) -> list[np.ndarray]:
+  '''
+    starts with the first stroke of every class. in every pass, the remaining training strokes are recognised with the current templates and the first misclassified stroke of every class is added. returns the selection after every pass; the passes stop when all training strokes are recognised correctly, after MAX_PASSES or when max_templates would be exceeded.
+  '''
+  labels = np.array([name for (name, _) in strokes], dtype=object)
+  _, first = np.unique(labels[valid], return_index=True)
+  selection = list(valid[first])
+  selections = [np.array(sorted(selection), dtype=int)]
+
+  for _ in range(CondenseConfig.MAX_PASSES):
+    r = _build(strokes, selections[-1])
+    remaining = np.setdiff1d(valid, selection)
+    _, names, _ = r.recognise_many([strokes[key][1] for key in remaining])
+    wrong = remaining[names != labels[remaining]]
+
+    if len(wrong) == 0:
+      break
+
+    _, first = np.unique(labels[wrong], return_index=True)
+
+    #add_template adds every stroke and its mirror
+    if max_templates is not None and 2 * (len(selection) + len(first)) > max_templates:
+      break
+
+    selection.extend(wrong[first])
+    selections.append(np.array(sorted(selection), dtype=int))
+
+  return selections
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="selects representative $1 templates per class from dataset/train and reports accuracy and latency on dataset/test")
+  parser.add_argument("--method", default=Method.KMEANS, choices=[Method.KMEANS, Method.CNN])
+  parser.add_argument("--templates", type=int, help="largest number of templates (each stroke adds a template and its mirror)")
+  parser.add_argument("--latency", type=float, help="largest median latency of recognise in ms")
+  parser.add_argument("--output", default=CondenseConfig.OUTPUT_PATH)
+  args = parser.parse_args()
+
+  train = load_point_strokes(CondenseConfig.TRAIN_PATH)
+  test = load_point_strokes(CondenseConfig.TEST_PATH)
+
+  #all training strokes converted once; strokes that add_template rejects are left out
+  converter = Recogniser(use_predefined_templates=False)
+  valid = np.array([key for (key, (name, points)) in enumerate(train) if converter.add_template(name, points)], dtype=int)
+  converted = np.zeros((len(train),) + converter.template_points.shape[1:])
+  converted[valid] = converter.template_points[0::2]
+
+  if args.method == Method.KMEANS:
+    selections = [_kmeans(train, converted, valid, k) for k in CondenseConfig.CLUSTERS]
+  else:
+    selections = _condensed_nearest_neighbour(train, valid, args.templates)
+
+  chosen = None
+  print(f"{'templates':>9} {'accuracy':>9} {'p50 latency':>12}")
+
+  for selection in selections:
+    r = _build(train, selection)
+
+    if args.templates is not None and len(r.templates) > args.templates:
+      continue
+
+    accuracy, latency = _evaluate(r, test)
+    print(f"{len(r.templates):>9} {accuracy:>9.3f} {latency * 1000:>10.2f}ms")
+
+    #the most accurate set within the budget; with equal accuracy, the smaller set is kept
+    if (args.latency is None or latency * 1000 <= args.latency) and (chosen is None or accuracy > chosen[1]):
+      chosen = (r, accuracy, latency)
+
+  if chosen is None:
+    print("no template set fits the budget")
+  else:
+    chosen[0].save_templates(args.output)
+    print(f"saved {len(chosen[0].templates)} templates ({chosen[1]:.3f} accuracy, {chosen[2] * 1000:.2f}ms) to {args.output}; load them with Recogniser(use_predefined_templates=False, template_store=path)")
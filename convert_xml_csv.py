@@ -1,46 +1,33 @@
-import os, csv, uuid
-import xml.etree.ElementTree as ET
+import os, csv
+
+from corpus import build_corpus
 
 SCRIPT_DIR = os.path.dirname(__file__)
-path = os.path.join(SCRIPT_DIR, "xml_logs")
-
-for root, subdirs, files in os.walk(path):
-  if 'ipynb_checkpoint' in root:
-      continue
-  
-  if len(files) == 0:
-    continue
-
-  for f in files:
-    if not f.endswith(".xml"):
-      continue
-
-    fname = f.split('.')[0]
-    label = fname[:-2]
-    
-    xml_root = ET.parse(f'{root}/{f}').getroot()
-    
-    points = []
-    counter = 0
-
-    header = ["idx", "label", "x", "y", "timestamp"]
-
-    for element in xml_root.findall('Point'):
-      idx = counter
-      x = element.get('X')
-      y = element.get('Y')
-      t = element.get('T')
-      
-      points.append([idx, label, x, y, t])
-      counter += 1
-        
-    path = os.path.join(SCRIPT_DIR, f"./raw_logs/{label}")
-    if not os.path.isdir(path):
-      os.mkdir(path)
-
-    idx = uuid.uuid4()
-    path = os.path.join(SCRIPT_DIR, f"./raw_logs/{label}/{idx}.csv")
-    with open(path, "w") as csv_file:
-      writer = csv.writer(csv_file, quoting=csv.QUOTE_NONE)
-      writer.writerow(header)
-      writer.writerows(points)
\ No newline at end of file
+
+#the xml logs are parsed into corpus.npz (see corpus.py), which only parses new or changed logs; the csv files are written from the corpus and named after the stroke, e.g. raw_logs/arrow/s02-fast-arrow01.csv
+corpus, _ = build_corpus()
+
+header = ["idx", "label", "x", "y", "timestamp"]
+names = {(str(label), str(name)) for (label, name) in zip(corpus.labels, corpus.names)}
+
+for i in range(len(corpus)):
+  label = str(corpus.labels[i])
+  points = [[idx, label, x, y, t] for (idx, (x, y, t)) in enumerate(corpus.stroke(i).tolist())]
+
+  path = os.path.join(SCRIPT_DIR, f"./raw_logs/{label}")
+  if not os.path.isdir(path):
+    os.mkdir(path)
+
+  path = os.path.join(SCRIPT_DIR, f"./raw_logs/{label}/{corpus.names[i]}.csv")
+  with open(path, "w") as csv_file:
+    writer = csv.writer(csv_file, quoting=csv.QUOTE_NONE)
+    writer.writerow(header)
+    writer.writerows(points)
+
+#csv files of strokes that are not in the corpus, e.g. the ones with the uuid names of earlier runs, would make every tool that walks raw_logs count a stroke twice
+for label in sorted({label for (label, _) in names}):
+  path = os.path.join(SCRIPT_DIR, f"./raw_logs/{label}")
+
+  for file_name in os.listdir(path):
+    if file_name.endswith(".csv") and (label, file_name[:-len(".csv")]) not in names:
+      os.remove(os.path.join(path, file_name))
@@ -0,0 +1,221 @@
+# columnar corpus of the xml_logs: one npz file with the points of all strokes and an offset index instead of one csv per gesture
+import os, sys, time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from recognizer import Point
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class CorpusConfig:
+  XML_PATH = os.path.join(SCRIPT_DIR, "xml_logs")
+  CORPUS_PATH = os.path.join(SCRIPT_DIR, "corpus.npz")
+  #files per task of the process pool
+  CHUNK_SIZE = 64
+
+
+class Corpus:
+  '''
+    strokes of the corpus in columns. the points of stroke i are x/y/t[offsets[i]:offsets[i + 1]]; all other columns have one entry per stroke.
+    strokes are ordered by the path of their xml file and named "sNN-speed-gesture", e.g. "s02-fast-arrow01", so names and order do not change between rebuilds.
+  '''
+
+  def __init__(self, columns: dict[str, np.ndarray]) -> None:
+    self.sources: np.ndarray = columns["sources"]
+    self.names: np.ndarray = columns["names"]
+    self.labels: np.ndarray = columns["labels"]
+    self.subjects: np.ndarray = columns["subjects"]
+    self.speeds: np.ndarray = columns["speeds"]
+    self.numbers: np.ndarray = columns["numbers"]
+    self.offsets: np.ndarray = columns["offsets"]
+    self.x: np.ndarray = columns["x"]
+    self.y: np.ndarray = columns["y"]
+    self.t: np.ndarray = columns["t"]
+    #size and modification time of the xml files, used for incremental rebuilds
+    self.sizes: np.ndarray = columns["sizes"]
+    self.mtimes: np.ndarray = columns["mtimes"]
+
+  def __len__(self) -> int:
+    return len(self.names)
+
+  def stroke(self, i: int) -> np.ndarray:
+    '''
+      points of stroke i as (n, 3) array of x, y and timestamp in milliseconds.
+    '''
+    start, end = self.offsets[i], self.offsets[i + 1]
+    return np.stack((self.x[start:end], self.y[start:end], self.t[start:end]), axis=1)
+
+  def points(self, i: int) -> list[Point]:
+    start, end = self.offsets[i], self.offsets[i + 1]
+    return [Point(float(x), float(y)) for (x, y) in zip(self.x[start:end], self.y[start:end])]
+
+  def columns(self) -> dict[str, np.ndarray]:
+    return {
+      "sources": self.sources,
+      "names": self.names,
+      "labels": self.labels,
+      "subjects": self.subjects,
+      "speeds": self.speeds,
+      "numbers": self.numbers,
+      "offsets": self.offsets,
+      "x": self.x,
+      "y": self.y,
+      "t": self.t,
+      "sizes": self.sizes,
+      "mtimes": self.mtimes
+    }
+
+
+def _parse(path: str) -> tuple[dict, np.ndarray]:
+  '''
+    streams one xml log. returns the attributes of the Gesture element and its points as (n, 3) int64 array of X, Y and T.
+  '''
+  attributes = None
+  points = []
+
+  for (event, element) in ET.iterparse(path, events=("start", "end")):
+    if event == "start":
+      if element.tag == "Gesture":
+        attributes = dict(element.attrib)
+      continue
+
+    if element.tag == "Point":
+      points.append((int(element.get("X")), int(element.get("Y")), int(element.get("T"))))
+      element.clear()
+
+  return (attributes, np.array(points, dtype=np.int64).reshape(-1, 3))
+
+def _parse_chunk(paths: list[str]) -> list[tuple[dict, np.ndarray]]:
+  return [_parse(path) for path in paths]
+
+def _find_files(path: str) -> list[str]:
+  '''
+    relative paths of all xml logs below path in sorted order.
+  '''
+  sources = []
+
+  for (root, _, files) in os.walk(path):
+    if 'ipynb_checkpoint' in root:
+      continue
+
+    for f in files:
+      if f.endswith(".xml"):
+        sources.append(os.path.relpath(os.path.join(root, f), path))
+
+  return sorted(sources)
+
+def load_corpus(path: str=CorpusConfig.CORPUS_PATH) -> Corpus:
+  '''
+    reads the whole corpus from a single npz file. returns None if the file does not exist.
+  '''
+  if not os.path.isfile(path):
+    return None
+
+  with np.load(path) as store:
+    return Corpus({key: store[key] for key in store.files})
+
+def save_corpus(corpus: Corpus, path: str=CorpusConfig.CORPUS_PATH) -> None:
+  #written to a temporary file first so that an interrupted build does not leave a broken corpus behind
+  temporary = path + ".tmp"
+
+  with open(temporary, "wb") as f:
+    np.savez(f, **corpus.columns())
+
+  os.replace(temporary, path)
+
+def build_corpus(xml_path: str=CorpusConfig.XML_PATH, path: str=CorpusConfig.CORPUS_PATH, processes: int=None) -> tuple[Corpus, int]:
+  '''
+    converts the xml logs below xml_path into the corpus at path. strokes of an existing corpus are reused if size and modification time of their xml file did not change, so only new or changed files are parsed; files that were removed are dropped.
+    the files are parsed in a process pool with processes workers (default: number of cpus). returns the corpus and the number of parsed files.
+  '''
+  sources = _find_files(xml_path)
+  stats = [os.stat(os.path.join(xml_path, source)) for source in sources]
+  sizes = np.array([s.st_size for s in stats], dtype=np.int64)
+  mtimes = np.array([s.st_mtime_ns for s in stats], dtype=np.int64)
+
+  previous = load_corpus(path)
+  cached = {}
+
+  if previous is not None:
+    for (i, source) in enumerate(previous.sources):
+      cached[str(source)] = i
+
+  #index of the stroke in the previous corpus or -1 if the file has to be parsed
+  reuse = np.full(len(sources), -1, dtype=int)
+  for (i, source) in enumerate(sources):
+    j = cached.get(source, -1)
+    if j >= 0 and previous.sizes[j] == sizes[i] and previous.mtimes[j] == mtimes[i]:
+      reuse[i] = j
+
+  missing = [os.path.join(xml_path, sources[i]) for i in np.flatnonzero(reuse < 0)]
+  chunks = [missing[i:i + CorpusConfig.CHUNK_SIZE] for i in range(0, len(missing), CorpusConfig.CHUNK_SIZE)]
+
+  if len(chunks) > 1 and processes != 1:
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+      parsed = [gesture for chunk in executor.map(_parse_chunk, chunks) for gesture in chunk]
+  else:
+    parsed = [gesture for chunk in chunks for gesture in _parse_chunk(chunk)]
+
+  parsed = iter(parsed)
+  names, labels, subjects, speeds, numbers, strokes = [], [], [], [], [], []
+
+  for (i, source) in enumerate(sources):
+    j = reuse[i]
+
+    if j >= 0:
+      names.append(str(previous.names[j]))
+      labels.append(str(previous.labels[j]))
+      subjects.append(int(previous.subjects[j]))
+      speeds.append(str(previous.speeds[j]))
+      numbers.append(int(previous.numbers[j]))
+      strokes.append(previous.stroke(j))
+      continue
+
+    attributes, points = next(parsed)
+    gesture_name = attributes["Name"]
+    subject = int(attributes["Subject"])
+    speed = attributes["Speed"]
+
+    names.append(f"s{subject:02d}-{speed}-{gesture_name}")
+    labels.append(gesture_name[:-2])
+    subjects.append(subject)
+    speeds.append(speed)
+    numbers.append(int(attributes["Number"]))
+    strokes.append(points)
+
+  lengths = np.array([len(stroke) for stroke in strokes], dtype=np.int64)
+  offsets = np.zeros(len(strokes) + 1, dtype=np.int64)
+  np.cumsum(lengths, out=offsets[1:])
+  points = np.concatenate(strokes) if len(strokes) > 0 else np.zeros((0, 3), dtype=np.int64)
+
+  corpus = Corpus({
+    "sources": np.array(sources, dtype=str),
+    "names": np.array(names, dtype=str),
+    "labels": np.array(labels, dtype=str),
+    "subjects": np.array(subjects, dtype=np.int64),
+    "speeds": np.array(speeds, dtype=str),
+    "numbers": np.array(numbers, dtype=np.int64),
+    "offsets": offsets,
+    "x": points[:, 0].copy(),
+    "y": points[:, 1].copy(),
+    "t": points[:, 2].copy(),
+    "sizes": sizes,
+    "mtimes": mtimes
+  })
+
+  #the corpus is only written again if a file was added, changed or removed
+  if previous is None or len(missing) > 0 or len(sources) != len(previous):
+    save_corpus(corpus, path)
+
+  return (corpus, len(missing))
+
+if __name__ == "__main__":
+  processes = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+  t1 = time.perf_counter()
+  corpus, parsed = build_corpus(processes=processes)
+  t2 = time.perf_counter()
+
+  print(f"{len(corpus)} strokes with {corpus.offsets[-1]} points, parsed {parsed} files in {t2 - t1:.2f}s")
@@ -1,43 +1,129 @@
-import os, random, shutil
+import os, sys, shutil
+
+import numpy as np
+
+from corpus import Corpus, build_corpus
 
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT = os.path.join(SCRIPT_DIR, "raw_logs/")
+SPLITS_PATH = os.path.join(SCRIPT_DIR, "splits.npz")
 
 TEST_PATH = os.path.join(SCRIPT_DIR, "dataset/test")
 TRAIN_PATH = os.path.join(SCRIPT_DIR, "dataset/train")
 K = 10
+FOLDS = 5
 SEED = 42
 
+class Split:
+  HOLDOUT = "holdout" #K strokes of each class are the test set
+  KFOLD = "kfold" #stratified k-fold, the index is the fold
+  SUBJECT = "subject" #leave one subject out, the index is the subject (1..11)
+
+
+def create_splits(corpus: Corpus, k: int=K, folds: int=FOLDS, seed: int=SEED) -> dict[str, np.ndarray]:
+  '''
+    assigns every stroke of the corpus to the holdout test set or not and to a fold of a stratified k-fold in one pass. the random generator is seeded once, so the splits only depend on the corpus and seed.
+    classes with fewer than k strokes get no test set. leave one subject out splits need no assignment, they follow from the subject of a stroke.
+  '''
+  rng = np.random.default_rng(seed)
+  test = np.zeros(len(corpus), dtype=bool)
+  fold = np.zeros(len(corpus), dtype=np.int64)
+
+  for label in np.unique(corpus.labels):
+    members = rng.permutation(np.flatnonzero(corpus.labels == label))
+
+    if len(members) >= k:
+      test[members[:k]] = True
+
+    #dealing the shuffled strokes of a class round robin keeps the folds stratified
+    fold[members] = np.arange(len(members)) % folds
+
+  return {
+    "names": corpus.names,
+    "labels": corpus.labels,
+    "subjects": corpus.subjects,
+    "test": test,
+    "fold": fold,
+    "config": np.array([k, folds, seed], dtype=np.int64)
+  }
+
+def save_splits(splits: dict[str, np.ndarray], path: str=SPLITS_PATH) -> None:
+  with open(path, "wb") as f:
+    np.savez(f, **splits)
+
+def load_splits(corpus: Corpus, path: str=SPLITS_PATH) -> dict[str, np.ndarray]:
+  '''
+    returns None if the manifest does not exist or was created for other strokes than the ones of the corpus.
+  '''
+  if not os.path.isfile(path):
+    return None
+
+  with np.load(path) as store:
+    splits = {key: store[key] for key in store.files}
+
+  if not np.array_equal(splits["names"], corpus.names):
+    return None
+
+  return splits
+
+def split(splits: dict[str, np.ndarray], scheme: str=Split.HOLDOUT, index: int=None) -> tuple[np.ndarray, np.ndarray]:
+  '''
+    returns the corpus indices of the train and the test strokes of a split.
+  '''
+  if scheme == Split.HOLDOUT:
+    test = splits["test"]
+  elif scheme == Split.KFOLD:
+    test = splits["fold"] == index
+  elif scheme == Split.SUBJECT:
+    test = splits["subjects"] == index
+  else:
+    raise ValueError(f"unknown split {scheme}")
+
+  return (np.flatnonzero(~test), np.flatnonzero(test))
+
 def add_file(origin_path, destination_folder, file_name):
   if not os.path.isdir(destination_folder):
-    os.mkdir(destination_folder)
+    os.makedirs(destination_folder)
 
   destination_path = os.path.join(destination_folder, file_name)
 
-  shutil.copy(origin_path, destination_path) #copy file from raw_logs to train or test
+  if os.path.exists(destination_path):
+    os.remove(destination_path)
+
+  try:
+    os.link(origin_path, destination_path) #link the file of raw_logs so that its data is not duplicated
+  except OSError:
+    shutil.copy(origin_path, destination_path) #e.g. raw_logs and the dataset are on different file systems
+
+def link_split(corpus: Corpus, train: np.ndarray, test: np.ndarray, train_path: str=TRAIN_PATH, test_path: str=TEST_PATH) -> None:
+  '''
+    materialises a split as folders of csv files for tools that read the files of a folder. train_path and test_path are emptied first so that no stroke of an earlier split is left in them.
+    the csv files of raw_logs must be named after the strokes (see convert_xml_csv.py); a FileNotFoundError is raised before anything is changed if one is missing.
+  '''
+  missing = [f"{corpus.labels[i]}/{corpus.names[i]}.csv" for i in np.concatenate((train, test)) if not os.path.isfile(os.path.join(ROOT, str(corpus.labels[i]), f"{corpus.names[i]}.csv"))]
+
+  if len(missing) > 0:
+    raise FileNotFoundError(f"{len(missing)} csv files of the split are missing in raw_logs (e.g. {missing[0]}), run convert_xml_csv.py first")
 
-for root, _, files in os.walk(ROOT):
-  class_length = len(files)
-  class_name = os.path.basename(root)
+  for path in (train_path, test_path):
+    if os.path.isdir(path):
+      shutil.rmtree(path)
 
-  if class_length < 10: #we dont want to create a testset if there are only 10 gestures available
-    continue
-  
-  random.seed(SEED) #to reproduce results, set a fix seed
-  indexes = random.sample(range(0, class_length), K) #get K random indexes from the list of files
+  for (indices, path) in ((train, train_path), (test, test_path)):
+    for i in indices:
+      class_name = str(corpus.labels[i])
+      file_name = f"{corpus.names[i]}.csv"
 
-  for key, file_name in enumerate(files):
-    if not file_name.endswith(".csv"):
-      continue
+      add_file(os.path.join(ROOT, class_name, file_name), os.path.join(path, class_name), file_name)
 
-    origin_file = os.path.join(ROOT, class_name, file_name)
+if __name__ == "__main__":
+  #python create_dataset.py [--link]: writes the split manifest and with --link also links the holdout split into dataset/train and dataset/test
+  corpus, _ = build_corpus()
+  splits = create_splits(corpus)
+  save_splits(splits)
 
-    if key in indexes:
-      #add to dataset/test
-      destination_folder = os.path.join(TEST_PATH, class_name)
-      add_file(origin_file, destination_folder, file_name)
+  train, test = split(splits)
+  print(f"{len(corpus)} strokes: holdout {len(train)}/{len(test)}, {FOLDS} folds, {len(np.unique(corpus.subjects))} subjects")
 
-    else:
-      #add to dataset/train
-      destination_folder = os.path.join(TRAIN_PATH, class_name)
-      add_file(origin_file, destination_folder, file_name)
+  if "--link" in sys.argv:
+    link_split(corpus, train, test)
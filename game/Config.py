@@ -17,6 +17,21 @@ class Rects:
   WIDTH = 200
   OFFSET = 7
 
+class Layers:
+  BACKGROUND = 0
+  CARD_INDICATOR = 1
+  CARD = 2
+  CARD_LABEL = 3
+  STROKE = 4
+  MENU = 5
+
+class Recognisers:
+  DOLLAR = "dollar"
+  LSTM = "lstm"
+  CASCADE = "cascade"
+  #the $1 recogniser of a running recognition_server.py
+  SERVER = "server"
+
 class Gestures:
   MEMORIES = ["circle", "rectangle", "triangle"]
   EXIT = "x"
@@ -33,6 +48,7 @@ class App:
   SAMPLE_POINTS = 50
 
   TOO_FEW_POINTS = "Too few points drawn."
+  RECOGNITION_FAILED = "Recognition failed"
 
   FLASH_TIME = 2
   FLASH_TIME_GAP = 0.5
@@ -41,14 +57,31 @@ class App:
 
   GESTURE_SHOW_TIME = 0.2
 
+  #seconds between two recognitions of the stroke that is still drawn
+  PREVIEW_INTERVAL = 0.1
+
+  #input conditioning of the pointer stream, see input_filter.py
+  INPUT_MIN_DISTANCE = 2.0
+  INPUT_MIN_INTERVAL = 0.005
+  INPUT_MAX_POINTS = 2048
+
   RECOGNISE_TEXT_X = 20
   RECOGNISE_TEXT_Y = 20
   STATE_TEXT_X = 20
   STATE_TEXT_Y = HEIGHT - 30
+  PERFORMANCE_TEXT_X = WIDTH - 20
+  PERFORMANCE_TEXT_Y = 20
+  #weight of the newest frame in the moving average of the frame time
+  FRAME_TIME_SMOOTHING = 0.1
+  PERFORMANCE_INTERVAL = 0.5
 
   START_GAME_TEXT = "STATE: SHOWING SEQUENCE"
   AWAIT_GAME_TEXT = "STATE: AWAITING YOUR GESTURE SEQUENCE"
   OVER_GAME_TEXT = "Game over! Sequence was incorrect! Draw X to end the game or CHECK to play a new game."
   WON_GAME_TEXT = "You managed to correctly guess the whole sequence. Congratulations!"
 
-  SOUNDFILE = "game/bell.wav"
\ No newline at end of file
+  SOUNDFILE = "game/bell.wav"
+  TEMPLATE_STORE = "game/templates.npz"
+  #the lstm and the cascade need the weights exported by lstm_recognizer.py (once, with tensorflow installed)
+  RECOGNISER = Recognisers.DOLLAR
+  LSTM_WEIGHTS = "lstm_weights.npz"
\ No newline at end of file
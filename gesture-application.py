@@ -1,15 +1,34 @@
 # application for task 3
 # gesture input program for first task
-import time, random, os
+import time, random, os, argparse
 from typing import Union
 
-from pyglet import app, media, window
-from pyglet.clock import schedule_once
-from pyglet.shapes import Circle, Rectangle
+import numpy as np
+from pyglet import app, gl, media, window
+from pyglet.clock import get_default, schedule_once, schedule_interval, unschedule
+from pyglet.graphics import Batch, Group
+from pyglet.shapes import Rectangle
 from pyglet.text import Label
 
-from game.Config import Color, Font, Rects, Gestures, App
+from game.Config import Color, Font, Rects, Gestures, App, Layers, Recognisers
 from recognizer import Recogniser, Point, Template
+from lstm_recognizer import LSTMRecogniser
+from recognizer_backend import RecogniserBackend, CascadeRecogniser
+from recognition_worker import RecognitionResult, RecognitionWorker
+from recognition_server import RecognitionClient
+from stroke_renderer import StrokeRenderer
+from input_filter import InputFilter
+from session_recorder import SessionRecorder
+
+
+#the groups are shared by all shapes of a layer so that the batch draws each layer with as few calls as possible, no matter how many cards or stroke points there are
+class Groups:
+  BACKGROUND = Group(order=Layers.BACKGROUND)
+  CARD_INDICATOR = Group(order=Layers.CARD_INDICATOR)
+  CARD = Group(order=Layers.CARD)
+  CARD_LABEL = Group(order=Layers.CARD_LABEL)
+  STROKE = Group(order=Layers.STROKE)
+  MENU = Group(order=Layers.MENU)
 
 
 class GameState:
@@ -20,15 +39,52 @@ class GameState:
   WON = 5
 
 
+class Board:
+  '''
+    geometry of the card grid. the cards are placed on a regular grid with a pitch of WIDTH + GAP, so the card under a point follows from integer division of its offset instead of testing the point against every card.
+  '''
+
+  def __init__(self, width: int, height: int) -> None:
+    self.pitch = Rects.WIDTH + Rects.GAP
+    self.padding_x = (width - (Rects.NUM_X * Rects.WIDTH + Rects.GAP * (Rects.NUM_X - 1))) / 2
+    self.padding_y = (height - (Rects.NUM_Y * Rects.WIDTH + Rects.GAP * (Rects.NUM_Y - 1))) / 2
+
+  def position(self, i: int, j: int) -> tuple[float, float]:
+    x = self.padding_x + i * Rects.GAP + i * Rects.WIDTH
+    y = self.padding_y + j * Rects.GAP + j * Rects.WIDTH
+
+    return (x, y)
+
+  def index(self, i: int, j: int) -> int:
+    return i + j + i * (Rects.NUM_Y - 1)
+
+  def collision_quantities(self, points: list[Point]) -> np.ndarray:
+    '''
+      number of points on each card, indexed like the cards. points in a gap or outside of the board are not counted; points on the border of a card count for the card.
+      a gesture consists of many points... the card with the most points is the card the user intended to draw on. requires a list of points that are not already resampled/scaled/turned etc.
+    '''
+    if len(points) == 0:
+      return np.zeros(Rects.NUM_X * Rects.NUM_Y, dtype=int)
+
+    local = np.array([(p.x, p.y) for p in points], dtype=float) - (self.padding_x, self.padding_y)
+    cells = np.floor(local / self.pitch).astype(int)
+    offsets = local - cells * self.pitch
+
+    inside = (cells[:, 0] >= 0) & (cells[:, 0] < Rects.NUM_X) & (cells[:, 1] >= 0) & (cells[:, 1] < Rects.NUM_Y) & (offsets <= Rects.WIDTH).all(axis=1)
+    indices = self.index(cells[inside, 0], cells[inside, 1])
+
+    return np.bincount(indices, minlength=Rects.NUM_X * Rects.NUM_Y)
+
+
 class Card:
 
-  def __init__(self, idx: int, x: int, y: int, width: float, height: float, color: tuple) -> None:
+  def __init__(self, idx: int, x: int, y: int, width: float, height: float, color: tuple, batch: Batch) -> None:
     self.idx = idx
     self.template_name = random.choice(Gestures.MEMORIES)
 
-    self.result_indicator = Rectangle(x=x-Rects.OFFSET, y=y-Rects.OFFSET, width=width + (2 * Rects.OFFSET), height=height + (2 * Rects.OFFSET), color=Color.RECTS_CORRECT)
-    self.background = Rectangle(x=x, y=y, width=width, height=height, color=color)
-    self.label = Label(text=self.template_name, x=x, y=y, color=Font.COLOUR, font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True)
+    self.result_indicator = Rectangle(x=x-Rects.OFFSET, y=y-Rects.OFFSET, width=width + (2 * Rects.OFFSET), height=height + (2 * Rects.OFFSET), color=Color.RECTS_CORRECT, batch=batch, group=Groups.CARD_INDICATOR)
+    self.background = Rectangle(x=x, y=y, width=width, height=height, color=color, batch=batch, group=Groups.CARD)
+    self.label = Label(text=self.template_name, x=x, y=y, color=Font.COLOUR, font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, batch=batch, group=Groups.CARD_LABEL)
     self._center_label(x, y)
 
     self.result_indicator.visible = False
@@ -40,19 +96,6 @@ class Card:
     self.label.x = x
     self.label.y = y
   
-  def collision_quantity(self, points: list[Point]) -> int:
-    '''
-      a gesture consists of many points... to check the box that the user intents to draw on, we return a value for each collision with a box and conclude that the box with the most collision is the intended box.
-      requires a list of points that are not already resampled/scaled/turned etc.
-    '''
-    counter = 0
-
-    for p in points:
-      if p.x >= self.background.x and p.x <= self.background.x + self.background.width and p.y >= self.background.y and p.y <= self.background.y + self.background.height:
-        counter += 1
-
-    return counter   
-
   def hint(self, start_delay: int, stop_delay: int) -> None:
     self.result_indicator.color = Color.RECTS_HINT
 
@@ -75,86 +118,104 @@ class Card:
     self.label.visible = False
     self.result_indicator.visible = False
 
-  def draw(self) -> None:
-    self.result_indicator.draw()
-    self.background.draw()
-    self.label.draw()
+  def delete(self) -> None:
+    self.result_indicator.delete()
+    self.background.delete()
+    self.label.delete()
 
 
 class Menu:
+  '''
+    labels of the menu. a text is only assigned if it differs from the shown text, since every assignment to Label.text lays the label out again.
+  '''
+
+  def __init__(self, batch: Batch) -> None:
+    self.recogniser_indicator = Label(text="", font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=App.RECOGNISE_TEXT_X, y=App.RECOGNISE_TEXT_Y, batch=batch, group=Groups.MENU)
+    self.state_indicator = Label(text="", font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=App.STATE_TEXT_X, y=App.STATE_TEXT_Y, batch=batch, group=Groups.MENU)
+    self.performance_indicator = Label(text="", font_name=Font.NAME, font_size=Font.TEXT_SIZE, color=Font.COLOUR, x=App.PERFORMANCE_TEXT_X, y=App.PERFORMANCE_TEXT_Y, anchor_x="right", batch=batch, group=Groups.MENU)
 
-  def __init__(self) -> None:
-    self.recogniser_indicator = Label(text="", font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=App.RECOGNISE_TEXT_X, y=App.RECOGNISE_TEXT_Y)
-    self.state_indicator = Label(text="", font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=App.STATE_TEXT_X, y=App.STATE_TEXT_Y)
+  def _set_text(self, label: Label, text: str) -> None:
+    if label.text != text:
+      label.text = text
 
   def too_few_points(self) -> None:
-    self.recogniser_indicator.text = App.TOO_FEW_POINTS
+    self._set_text(self.recogniser_indicator, App.TOO_FEW_POINTS)
+
+  def recognition_failed(self, error: Exception) -> None:
+    self._set_text(self.recogniser_indicator, f"{App.RECOGNITION_FAILED}: {type(error).__name__}: {error}")
 
   def recognition_result(self, result: Template, time: int) -> None:
     accuracy = format(result[1], ".2f")
     t_delta = round((time) * 1000)
     
-    self.recogniser_indicator.text = f"Result: {result[0].name} ({accuracy}) in {t_delta}ms."
+    self._set_text(self.recogniser_indicator, f"Result: {result[0].name} ({accuracy}) in {t_delta}ms.")
+
+  def recognition_preview(self, result: Template) -> None:
+    accuracy = format(result[1], ".2f")
 
-  def draw(self) -> None:
-    self.recogniser_indicator.draw()
-    self.state_indicator.draw()
+    self._set_text(self.recogniser_indicator, f"Preview: {result[0].name} ({accuracy})")
+
+  def performance(self, frame_time: float, recognition_time: float, escalation_rate: float=None) -> None:
+    #frame time and recognition time are measured separately because recognition does not run on the pyglet thread anymore
+    text = f"frame: {frame_time * 1000:.1f}ms | recognition: {round(recognition_time * 1000)}ms"
+
+    if escalation_rate is not None:
+      text += f" | escalated: {escalation_rate:.0%}"
+
+    self._set_text(self.performance_indicator, text)
 
   def start_game(self) -> None:
-    self.state_indicator.text = App.START_GAME_TEXT
+    self._set_text(self.state_indicator, App.START_GAME_TEXT)
 
   def await_game(self) -> None:
-    self.state_indicator.text = App.AWAIT_GAME_TEXT
+    self._set_text(self.state_indicator, App.AWAIT_GAME_TEXT)
 
   def game_over(self) -> None:
-    self.state_indicator.text = App.OVER_GAME_TEXT
+    self._set_text(self.state_indicator, App.OVER_GAME_TEXT)
 
   def game_won(self) -> None:
-    self.state_indicator.text = App.WON_GAME_TEXT
+    self._set_text(self.state_indicator, App.WON_GAME_TEXT)
 
 
 class Game():
 
   SCRIPT_DIR = os.path.dirname(__file__)
 
-  def __init__(self, width: int, height: int, menu: Menu) -> None:
+  def __init__(self, width: int, height: int, menu: Menu, batch: Batch) -> None:
     self.menu = menu
+    self.batch = batch
     self.sound_file = media.load(os.path.join(self.SCRIPT_DIR, App.SOUNDFILE))
     self.audio_player = media.Player()
     self.cards: list[Card] = []
-    self.sequence: list[int] = list(range(18))
+    self.board = Board(width, height)
+    self.sequence: list[int] = list(range(Rects.NUM_X * Rects.NUM_Y))
     random.shuffle(self.sequence)
 
     self.sequence_index = 0 #this indicates how many cards are turned in a sequence
     self.player_index = 0 #this indicates the number of sequence items a player has correctly guessed
-    self.state = GameState.SHOW
-    self._draw_cards(width, height)
-
-  def _draw_cards(self, width: int, height: int) -> None:
-    padding_x = (width - (Rects.NUM_X * Rects.WIDTH + Rects.GAP * (Rects.NUM_X - 1))) / 2
-    padding_y = (height - (Rects.NUM_Y * Rects.WIDTH + Rects.GAP * (Rects.NUM_Y - 1))) / 2
+    self.state: int = None
+    self._draw_cards()
+    self._set_state(GameState.SHOW)
 
+  def _draw_cards(self) -> None:
     for i in range(Rects.NUM_X):
       for j in range(Rects.NUM_Y):
-        x = padding_x + i * Rects.GAP + i * Rects.WIDTH
-        y = padding_y + j * Rects.GAP + j * Rects.WIDTH
-        idx = i + j + i * (Rects.NUM_Y - 1)
+        x, y = self.board.position(i, j)
+        idx = self.board.index(i, j)
 
-        card = Card(idx=idx,x=x, y=y, width=Rects.WIDTH, height=Rects.WIDTH, color=Color.RECTS)
+        card = Card(idx=idx,x=x, y=y, width=Rects.WIDTH, height=Rects.WIDTH, color=Color.RECTS, batch=self.batch)
         
         self.cards.append(card)
 
   def _check_collision(self, points: list[Point]) -> Union[Card, None]:
-    intented_card: Card = None
-    current_quantity = 0
+    quantities = self.board.collision_quantities(points)
+    #argmax returns the first card with the most points like the strict comparison of the loop over the cards did
+    intented_card = int(np.argmax(quantities))
 
-    for card in self.cards:
-      quantity = card.collision_quantity(points)
-      if quantity > current_quantity:
-        current_quantity = quantity
-        intented_card = card
+    if quantities[intented_card] == 0:
+      return None
 
-    return intented_card
+    return self.cards[intented_card]
 
   def handle_gesture(self, points: list[Point], gesture_name: str) -> None:
     #returns true if game state is currently on show so that the user knows that the computer is still showing the current sequence and the player has to wait.
@@ -163,9 +224,14 @@ class Game():
 
     collided_card = self._check_collision(points)
 
+    #the gesture was drawn next to the cards
+    if collided_card is None:
+      return
+
     #if player reaches the end of the game because all cards are correctly guessed
     if collided_card.label.text == gesture_name and collided_card.idx == self.sequence[self.sequence_index] and self.sequence_index == self.player_index and len(self.sequence) - 1 == self.player_index:
-      self.state = GameState.END #game won
+      collided_card.correct()
+      self._set_state(GameState.WON)
 
     #if player reached the current sequence index
     elif collided_card.label.text == gesture_name and collided_card.idx == self.sequence[self.sequence_index] and self.sequence_index == self.player_index:
@@ -185,120 +251,212 @@ class Game():
       
       collided_card.wrong()
 
-      self.state = GameState.END
+      self._set_state(GameState.END)
 
+  def _set_state(self, state: int) -> None:
+    '''
+      the labels, the cards and the scheduled timelines only change here, on a transition, so that nothing is laid out or scheduled while the board is idle.
+    '''
+    if state == self.state:
+      return
 
-  def _change_state_to_show(self, *_) -> None:
-    self.state = GameState.SHOW
+    self.state = state
 
-  def _change_state_to_await(self, *_) -> None:
-    self.state = GameState.AWAIT
-    self.audio_player.queue(self.sound_file)
-    self.audio_player.play()
+    if state == GameState.SHOW:
+      self.menu.start_game()
+      self._show_sequence()
 
-  def _turn_all_cards(self) -> None:
-    for card in self.cards:
-      card.unturn()
+    elif state == GameState.AWAIT:
+      self.menu.await_game()
+      self.audio_player.queue(self.sound_file)
+      self.audio_player.play()
 
-  def draw(self):
-    for card in self.cards:
-      card.draw()
+    elif state == GameState.END:
+      self.menu.game_over()
 
-    if self.state == GameState.SHOW:
-      self.menu.start_game()
+    elif state == GameState.WON:
+      self.menu.game_won()
 
-      self._turn_all_cards()
+  def _show_sequence(self) -> None:
+    self._turn_all_cards()
 
-      last_delay = 0
-      #shows the cards with their designated gesture in sequence defined with schedule_once function
-      for i in range(self.sequence_index + 1):
-        start_delay = i * App.FLASH_TIME + (i - 1) * App.FLASH_TIME_GAP
-        stop_delay = start_delay + App.FLASH_TIME
-        last_delay = stop_delay #mark for game state change so that drawn gestures are processed as player sequence
+    last_delay = 0
+    #shows the cards with their designated gesture in sequence defined with schedule_once function
+    for i in range(self.sequence_index + 1):
+      start_delay = i * App.FLASH_TIME + (i - 1) * App.FLASH_TIME_GAP
+      stop_delay = start_delay + App.FLASH_TIME
+      last_delay = stop_delay #mark for game state change so that drawn gestures are processed as player sequence
 
-        self.cards[self.sequence[i]].hint(start_delay, stop_delay)
-      
-      schedule_once(self._change_state_to_await, last_delay)
-      self.state = GameState.INTER
-      self.player_index = 0
+      self.cards[self.sequence[i]].hint(start_delay, stop_delay)
     
-    elif self.state == GameState.AWAIT:
-      self.menu.await_game()
+    schedule_once(self._change_state_to_await, last_delay)
+    self.state = GameState.INTER
+    self.player_index = 0
 
-    elif self.state == GameState.END:
-      self.menu.game_over()
+  def _change_state_to_show(self, *_) -> None:
+    self._set_state(GameState.SHOW)
 
-    elif self.state == GameState.WON:
-      self.menu.game_won()
+  def _change_state_to_await(self, *_) -> None:
+    self._set_state(GameState.AWAIT)
+
+  def _turn_all_cards(self) -> None:
+    for card in self.cards:
+      card.unturn()
+
+  def delete(self) -> None:
+    #the timelines of a replaced game must not touch its deleted cards
+    unschedule(self._change_state_to_show)
+    unschedule(self._change_state_to_await)
+
+    for card in self.cards:
+      unschedule(card.turn)
+      unschedule(card.unturn)
+      card.delete()
 
 
 class Application:
 
   FPS = 1/60
 
-  def __init__(self) -> None:
-    self.window = window.Window(width=App.WIDTH, height=App.HEIGHT, caption=App.NAME)
-    self.background = Rectangle(x=0, y=0, width=self.window.width, height=self.window.height, color=Color.BACKGROUND)
+  def __init__(self, config: gl.Config=None) -> None:
+    '''
+      config: gl config of the window, e.g. for a headless window (see replay_session.py). input is timed with the default pyglet clock so that a replay can run it on a virtual clock.
+    '''
+    self.window = window.Window(width=App.WIDTH, height=App.HEIGHT, caption=App.NAME, config=config)
+    self.batch = Batch()
+    self.background = Rectangle(x=0, y=0, width=self.window.width, height=self.window.height, color=Color.BACKGROUND, batch=self.batch, group=Groups.BACKGROUND)
+    self.circles = StrokeRenderer(self.batch, Groups.STROKE, App.CIRCLE_RADIUS_START, App.CIRCLE_COLOUR_START, App.CIRCLE_RADIUS, App.CIRCLE_COLOUR)
     self.on_draw = self.window.event(self.on_draw)
 
     self.on_mouse_drag = self.window.event(self.on_mouse_drag)
     self.on_mouse_release = self.window.event(self.on_mouse_release)
     self.on_mouse_press = self.window.event(self.on_mouse_press)
 
-    self.recogniser = Recogniser()
-    self.menu = Menu()
+    self.recogniser = self._create_recogniser()
+    #the cascade only counts final strokes, so previews only ask its fast recogniser
+    self.worker = RecognitionWorker(self.recogniser, self.recogniser.fast if isinstance(self.recogniser, CascadeRecogniser) else None)
+    schedule_interval(self._poll_recognition, self.FPS)
+    schedule_interval(self._show_performance, App.PERFORMANCE_INTERVAL)
+    self.input = InputFilter(App.INPUT_MIN_DISTANCE, App.INPUT_MIN_INTERVAL, App.INPUT_MAX_POINTS)
+    self.menu = Menu(self.batch)
+    self.game: Game = None
+    self.stroke_id = 0
+    self.frame_time = 0.0
+    self.recognition_time = 0.0
 
     self._init()
     
+  def _create_recogniser(self) -> RecogniserBackend:
+    if App.RECOGNISER == Recognisers.LSTM:
+      return LSTMRecogniser(os.path.join(Game.SCRIPT_DIR, App.LSTM_WEIGHTS))
+
+    if App.RECOGNISER == Recognisers.SERVER:
+      return RecognitionClient()
+
+    recogniser = Recogniser(template_store=os.path.join(Game.SCRIPT_DIR, App.TEMPLATE_STORE))
+
+    if App.RECOGNISER == Recognisers.CASCADE:
+      return CascadeRecogniser(recogniser, LSTMRecogniser(os.path.join(Game.SCRIPT_DIR, App.LSTM_WEIGHTS)))
+
+    return recogniser
+
   def _init(self) -> None:
-    self.game = Game(self.window.width, self.window.height, self.menu)
+    if self.game is not None:
+      self.game.delete()
+
+    self.game = Game(self.window.width, self.window.height, self.menu, self.batch)
     self._clear_gesture()
 
   def _clear_gesture(self, *_) -> None:
-    self.circles: list[Circle] = []
-    self.points: list[Point] = []
+    self.circles.clear()
+    self.input.reset()
+    self.stroke = self.input.stroke
+    #results of older strokes are dropped by comparing the stroke id
+    self.stroke_id += 1
+    self.stroke_released = False
+    self.last_submit = 0.0
+    self.preview: RecognitionResult = None
 
   def run(self) -> None:
-    app.run()        
+    #frames are paced by the pyglet clock instead of sleeping in on_draw
+    app.run(self.FPS)
 
   def on_draw(self) -> None:
+    t1 = time.perf_counter()
+
     self.window.clear()
-    self.background.draw()
-    
-    self.game.draw()
-    for circle in self.circles:
-      circle.draw()
-    
-    self.menu.draw()
+    #the game only changes the batch on state transitions, so drawing does no layout work while the board is idle
+    self.batch.draw()
 
-    time.sleep(self.FPS)
+    frame_time = time.perf_counter() - t1
+    self.frame_time += App.FRAME_TIME_SMOOTHING * (frame_time - self.frame_time)
 
   def on_mouse_drag(self, x: int, y: int, *_) -> None:
-    if len(self.circles) == 0:
-      circle = Circle(x=x, y=y, radius=App.CIRCLE_RADIUS_START, color=App.CIRCLE_COLOUR_START)
-    
-    else:
-      circle = Circle(x=x, y=y, radius=App.CIRCLE_RADIUS, color=App.CIRCLE_COLOUR)
+    #near duplicate points of high rate input devices are dropped before they are drawn or recognised
+    now = get_default().time()
+
+    if not self.input.add(Point(x,y), now):
+      return
+
+    self.circles.add(x, y)
+
+    #recognise the unfinished stroke in the background so that the result is (almost) ready when the stroke ends
+    if now - self.last_submit >= App.PREVIEW_INTERVAL:
+      self.last_submit = now
+      self.worker.submit(self.stroke_id, self.stroke)
+
+  def _poll_recognition(self, *_) -> None:
+    for result in self.worker.poll():
+      #final results are handled even if a new stroke was started in the meantime; previews are only shown for the stroke that is drawn
+      if result.final:
+        self._handle_result(result)
+        continue
+
+      if result.stroke_id != self.stroke_id or self.stroke_released or result.result[0] is None:
+        continue
+
+      self.preview = result
+      self.menu.recognition_preview(result.result)
 
-    self.circles.append(circle)
-    self.points.append(Point(x,y))
+  def _show_performance(self, *_) -> None:
+    #updated at a fixed interval instead of every poll, since the frame time changes with every frame
+    escalation_rate = self.recogniser.escalation_rate if isinstance(self.recogniser, CascadeRecogniser) else None
+    self.menu.performance(self.frame_time, self.recognition_time, escalation_rate)
 
   def on_mouse_release(self, *_) -> None:
-    t1 = time.time()
-    result = self.recogniser.recognise(self.points)
-    t2 = time.time()
+    self.stroke_released = True
+
+    #the end of the stroke is kept even if its last point was dropped
+    point = self.input.finish()
+    if point is not None:
+      self.circles.add(point.x, point.y)
+
+    #no point was added since the last preview, so its result is the final result if it came from the same recogniser
+    if self.preview is not None and self.preview.point_count == self.stroke.added_count and self.worker.preview_recogniser is self.worker.recogniser:
+      self._handle_result(self.preview)
+      return
+
+    #the result arrives in _poll_recognition, so rendering and scheduled timelines keep running meanwhile
+    self.worker.submit(self.stroke_id, self.stroke, final=True)
+
+  def _handle_result(self, recognition: RecognitionResult) -> None:
+    result = recognition.result
+    self.recognition_time = recognition.duration
+
+    if recognition.error is not None:
+      self.menu.recognition_failed(recognition.error)
+      return
 
     if result[0] == None:
       self.menu.too_few_points()
       return
 
     gesture_name = result[0].name
-    delay = t2 - t1
 
-    self.menu.recognition_result(result, delay)
+    self.menu.recognition_result(result, recognition.duration)
 
     if gesture_name in Gestures.MEMORIES:
-      self.game.handle_gesture(self.points, gesture_name)
+      self.game.handle_gesture(recognition.stroke.points, gesture_name)
 
     elif gesture_name == Gestures.RELOAD:#reload the game by drawing a check gesture
       self._init()
@@ -306,12 +464,28 @@ class Application:
     elif gesture_name == Gestures.EXIT:#exit the game by drawing a x gesture
       app.exit()
 
-    schedule_once(self._clear_gesture, App.GESTURE_SHOW_TIME)
+    #a result that arrives after the next stroke was started must not clear the new stroke
+    if recognition.stroke_id == self.stroke_id:
+      schedule_once(self._clear_gesture, App.GESTURE_SHOW_TIME)
     
   def on_mouse_press(self, *_) -> None:
     self._clear_gesture()
 
 
 if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="gesture memory game")
+  parser.add_argument("--record", help="write the mouse input of the session to this file for replay_session.py")
+  args = parser.parse_args()
+
+  #the recorder seeds random before the game draws its cards and sequence
+  recorder = SessionRecorder() if args.record is not None else None
   application = Application()
-  application.run()
\ No newline at end of file
+
+  if recorder is not None:
+    recorder.attach(application.window)
+
+  application.run()
+
+  if recorder is not None:
+    recorder.save(args.record)
+    print(f"recorded {len(recorder)} events to {args.record}")
\ No newline at end of file
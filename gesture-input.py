@@ -1,12 +1,16 @@
 # gesture input program for first task
-import time
+import time, os
 
 from pyglet import app, window
-from pyglet.shapes import Circle
+from pyglet.clock import schedule_interval
+from pyglet.graphics import Batch, Group
 from pyglet.text import Label
 from pyglet.window import key
 
 from recognizer import Point, Recogniser
+from recognition_worker import RecognitionResult, RecognitionWorker
+from stroke_renderer import StrokeRenderer
+from input_filter import InputFilter
 
 class Font:
   COLOUR = (255,255,255,255)
@@ -21,12 +25,17 @@ class Application:
   WIDTH = 1280
   HEIGTH = 720
   NAME = "Gesture Recogniser"
+  SCRIPT_DIR = os.path.dirname(__file__)
+  TEMPLATE_STORE = "templates.npz"
 
   CIRCLE_COLOUR = (255,0,0,255)
   CIRCLE_RADIUS = 5
   CIRCLE_COLOUR_START = (0,0,255,255)
   CIRCLE_RADIUS_START = 8
 
+  #seconds between two recognitions of the stroke that is still drawn
+  PREVIEW_INTERVAL = 0.1
+
   def __init__(self) -> None:
     self.window = window.Window(self.WIDTH, self.HEIGTH, caption=self.NAME)
     self.on_draw = self.window.event(self.on_draw)
@@ -36,54 +45,98 @@ class Application:
     self.on_mouse_release = self.window.event(self.on_mouse_release)
     self.on_mouse_press = self.window.event(self.on_mouse_press)
 
-    self.recogniser = Recogniser()
+    self.recogniser = Recogniser(template_store=os.path.join(self.SCRIPT_DIR, self.TEMPLATE_STORE))
+
+    self.worker = RecognitionWorker(self.recogniser)
+    schedule_interval(self._poll_recognition, self.FPS)
 
-    self.shapes: list[Circle] = []
-    self.points: list[Point] = []
+    #everything is drawn with one batch; the label is drawn on top of the stroke
+    self.batch = Batch()
+    self.shapes = StrokeRenderer(self.batch, Group(order=0), self.CIRCLE_RADIUS_START, self.CIRCLE_COLOUR_START, self.CIRCLE_RADIUS, self.CIRCLE_COLOUR)
+    self.input = InputFilter()
+    self.stroke = self.input.stroke
+    #results of older strokes are dropped by comparing the stroke id
+    self.stroke_id = 0
+    self.stroke_released = False
+    self.last_submit = 0.0
+    self.preview: RecognitionResult = None
 
-    self.label = Label(text=Font.DETECTED_GESTURE, font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=Font.TEXT_X, y=Font.TEXT_Y)
+    self.label = Label(text=Font.DETECTED_GESTURE, font_name=Font.NAME, font_size=Font.TEXT_SIZE, bold=True, color=Font.COLOUR, x=Font.TEXT_X, y=Font.TEXT_Y, batch=self.batch, group=Group(order=1))
 
   def run(self) -> None:
     app.run()        
 
   def on_draw(self) -> None:
     self.window.clear()
-
-    for point in self.shapes:
-      point.draw()
-    self.label.draw()
+    self.batch.draw()
 
     time.sleep(self.FPS)
 
   def on_mouse_drag(self, x: int, y: int, *_) -> None:
     #draws the first circle in blue and larger so that the starting points is recognisable
-    if len(self.shapes) == 0:
-      shape = Circle(x=x, y=y, radius=self.CIRCLE_RADIUS_START, color=self.CIRCLE_COLOUR_START)
-    
-    else:
-      shape = Circle(x=x, y=y, radius=self.CIRCLE_RADIUS, color=self.CIRCLE_COLOUR)
+    #near duplicate points of high rate input devices are dropped before they are drawn or recognised
+    if not self.input.add(Point(x,y), time.perf_counter()):
+      return
+
+    self.shapes.add(x, y)
 
-    self.shapes.append(shape)
-    self.points.append(Point(x,y))
+    #recognise the unfinished stroke in the background so that the result is (almost) ready when the stroke ends
+    if time.perf_counter() - self.last_submit >= self.PREVIEW_INTERVAL:
+      self.last_submit = time.perf_counter()
+      self.worker.submit(self.stroke_id, self.stroke)
 
   def on_mouse_release(self, *_) -> None:
-    t1 = time.time()
-    result = self.recogniser.recognise(self.points)
+    self.stroke_released = True
+
+    #the end of the stroke is kept even if its last point was dropped
+    point = self.input.finish()
+    if point is not None:
+      self.shapes.add(point.x, point.y)
+
+    #no point was added since the last preview, so its result is the final result
+    if self.preview is not None and self.preview.point_count == self.stroke.added_count:
+      self._show_result(self.preview)
+      return
+
+    self.worker.submit(self.stroke_id, self.stroke, final=True)
+
+  def _poll_recognition(self, *_) -> None:
+    for result in self.worker.poll():
+      if result.stroke_id != self.stroke_id:
+        continue
+
+      if result.final:
+        self._show_result(result)
+
+      elif not self.stroke_released and result.result[0] is not None:
+        self.preview = result
+        accuracy = format(result.result[1], ".2f")
+        self.label.text = f"Preview: {result.result[0].name} ({accuracy})"
+
+  def _show_result(self, result: RecognitionResult) -> None:
+    if result.error is not None:
+      self.label.text = f"Recognition failed: {type(result.error).__name__}: {result.error}"
+      return
 
     #if points are too few or points are all on the same axis (leads to division by zero), returned template is none
-    if result[0] == None:
+    if result.result[0] == None:
       self.label.text = "Too few points drawn."
       return 
 
-    gesture_name = result[0].name
-    accuracy = format(result[1], ".2f")
-    t_delta = round((time.time() - t1) * 1000)
+    gesture_name = result.result[0].name
+    accuracy = format(result.result[1], ".2f")
+    t_delta = round(result.duration * 1000)
     
     self.label.text = f"Result: {gesture_name} ({accuracy}) in {t_delta}ms."
     
   def on_mouse_press(self, *_) -> None:
-    self.shapes = []
-    self.points = []
+    self.shapes.clear()
+    self.input.reset()
+    self.stroke = self.input.stroke
+    self.stroke_id += 1
+    self.stroke_released = False
+    self.last_submit = 0.0
+    self.preview = None
 
   def on_key_press(self, symbol: int, _) -> None:
     if symbol == key.ESCAPE:
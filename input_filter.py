@@ -0,0 +1,115 @@
+# input conditioning between the pointer events of the window and the recogniser
+import os, sys
+from typing import Union
+
+from training_data import load_strokes
+from recognizer import Point, Recogniser, Stroke
+
+class FilterConfig:
+  #defaults used by the applications; with these, the recognition results of dataset/test may differ from the unfiltered strokes for at most TOLERANCE of the strokes
+  MIN_DISTANCE = 2.0
+  MIN_INTERVAL = 0.005
+  MAX_POINTS = 2048
+  TOLERANCE = 0.02
+
+
+class InputFilter:
+  '''
+    conditions the raw pointer stream of a stroke before it reaches the Stroke:
+    - points equal to the last kept point are merged
+    - points closer than min_distance (pixel) to the last kept point are dropped
+    - points that arrive less than min_interval seconds after the last kept point are dropped
+    - the stroke is a ring buffer of at most max_points points
+    the last dropped point is added by finish() so that the end of the stroke is kept.
+  '''
+
+  def __init__(self, min_distance: float=FilterConfig.MIN_DISTANCE, min_interval: float=FilterConfig.MIN_INTERVAL, max_points: int=FilterConfig.MAX_POINTS) -> None:
+    self.min_distance = min_distance
+    self.min_interval = min_interval
+    self.max_points = max_points
+    self.reset()
+
+  def reset(self) -> None:
+    self.stroke = Stroke(self.max_points)
+    self.merged_count = 0
+    self.decimated_count = 0
+
+    self._last_time = None
+    self._last_dropped: Point = None
+
+  @property
+  def dropped_count(self) -> int:
+    return self.merged_count + self.decimated_count + self.stroke.evicted_count
+
+  def add(self, point: Point, timestamp: float) -> bool:
+    '''
+      returns True if the point was added to the stroke.
+    '''
+    if len(self.stroke) > 0:
+      last = self.stroke.points[-1]
+      d_x = point.x - last.x
+      d_y = point.y - last.y
+
+      if d_x == 0 and d_y == 0:
+        self.merged_count += 1
+        return False
+
+      if d_x * d_x + d_y * d_y < self.min_distance * self.min_distance or timestamp - self._last_time < self.min_interval:
+        self.decimated_count += 1
+        self._last_dropped = point
+        return False
+
+    self.stroke.add(point)
+    self._last_time = timestamp
+    self._last_dropped = None
+
+    return True
+
+  def finish(self) -> Union[Point, None]:
+    '''
+      adds the last point of the stroke if it was dropped and returns it.
+    '''
+    point = self._last_dropped
+
+    if point is not None:
+      self.stroke.add(point)
+      self.decimated_count -= 1
+      self._last_dropped = None
+
+    return point
+
+
+def _load_strokes(path: str) -> list[tuple[str, list[tuple[float, float, float]]]]:
+  #timestamps of the dataset are in milliseconds
+  return [(name, [(x, y, t / 1000) for (x, y, t) in rows.tolist()]) for (name, rows) in load_strokes(path, ("x", "y", "timestamp"))]
+
+if __name__ == "__main__":
+  #replays the strokes of dataset/test through the default filter and checks that the recognition stays within the tolerance
+  SCRIPT_DIR = os.path.dirname(__file__)
+  strokes = _load_strokes(os.path.join(SCRIPT_DIR, "dataset/test"))
+  recogniser = Recogniser()
+
+  changed = 0
+  total_points = 0
+  dropped = 0
+
+  for (_, rows) in strokes:
+    input_filter = InputFilter()
+
+    for (x, y, t) in rows:
+      input_filter.add(Point(x, y), t)
+    input_filter.finish()
+
+    raw = recogniser.recognise([Point(x, y) for (x, y, _) in rows])
+    filtered = recogniser.recognise(input_filter.stroke)
+
+    if raw[0] is None or filtered[0] is None or raw[0].name != filtered[0].name:
+      changed += 1
+
+    total_points += len(rows)
+    dropped += input_filter.dropped_count
+
+  print(f"dropped {dropped} of {total_points} points ({dropped / total_points:.1%})")
+  print(f"changed results: {changed} of {len(strokes)} strokes ({changed / len(strokes):.1%}), tolerance {FilterConfig.TOLERANCE:.1%}")
+
+  sys.exit(0 if changed / len(strokes) <= FilterConfig.TOLERANCE else 1)
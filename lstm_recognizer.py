@@ -0,0 +1,195 @@
+# numpy runtime of the lstm trained in unistroke-gestures.ipynb, so that the applications can use it without importing tensorflow
+import os, ast
+from typing import Union
+
+import numpy as np
+
+from recognizer import Config, Point, Stroke, Template
+from training_data import standardise, load_dataset
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class LSTMConfig:
+  MODEL_PATH = os.path.join(SCRIPT_DIR, "trained_model")
+  LABELS_PATH = os.path.join(SCRIPT_DIR, "labels_model.txt")
+  WEIGHTS_PATH = os.path.join(SCRIPT_DIR, "lstm_weights.npz")
+  TEST_PATH = os.path.join(SCRIPT_DIR, "dataset/test")
+  #largest difference of a class probability to keras that export_weights accepts
+  TOLERANCE = 1e-4
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+  return 1.0 / (1.0 + np.exp(-x))
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+  e = np.exp(x - x.max(axis=-1, keepdims=True))
+  return e / e.sum(axis=-1, keepdims=True)
+
+ACTIVATIONS = {
+  "linear": lambda x: x,
+  "relu": lambda x: np.maximum(x, 0.0),
+  "sigmoid": _sigmoid,
+  "tanh": np.tanh,
+  "softmax": _softmax
+}
+
+def resample(points: np.ndarray, num: int) -> np.ndarray:
+  '''
+    scipy.signal.resample(points, num) along the points axis (-2) of a (N, 2) stroke or a (B, N, 2) batch of strokes with the same length, with numpy.fft only.
+  '''
+  x = np.moveaxis(points, -2, -1)
+  n = x.shape[-1]
+  m = min(num, n)
+  spectrum = np.fft.rfft(x)[..., :m // 2 + 1]
+
+  #the unpaired bin at m // 2 is united (downsampling) or split (upsampling) like scipy does
+  if m % 2 == 0 and num != n:
+    spectrum[..., m // 2] *= 2.0 if num < n else 0.5
+
+  return np.moveaxis(np.fft.irfft(spectrum / (n / num), n=num), -1, -2)
+
+def preprocess(points: Union[list[Point], Stroke], sample_points: int) -> np.ndarray:
+  '''
+    the stroke standardised and resampled like get_data of the notebook.
+  '''
+  points = np.array([(p.x, p.y) for p in (points.points if isinstance(points, Stroke) else points)], dtype=float)
+
+  return resample(standardise(points), sample_points)
+
+
+class LSTMRecogniser:
+  '''
+    forward pass of the exported keras model: one LSTM layer (gates in keras order i, f, c, o) followed by dense layers. dropout layers are only active while training and are not exported.
+    recognise and recognise_many return the same types as Recogniser; the template is the class and the score its probability.
+  '''
+
+  def __init__(self, path: str=LSTMConfig.WEIGHTS_PATH) -> None:
+    with np.load(path) as weights:
+      self.kernel = weights["lstm_kernel"]
+      self.recurrent_kernel = weights["lstm_recurrent_kernel"]
+      self.bias = weights["lstm_bias"]
+      self.activations = [str(a) for a in weights["activations"]]
+      self.dense = [(weights[f"dense_kernel_{i}"], weights[f"dense_bias_{i}"]) for i in range(len(self.activations))]
+      self.sample_points = int(weights["sample_points"])
+      labels = weights["labels"]
+
+    self.units = self.recurrent_kernel.shape[0]
+    self.templates = [Template(index, str(name), []) for (index, name) in enumerate(labels)]
+
+  def predict(self, x: np.ndarray) -> np.ndarray:
+    '''
+      class probabilities (N, classes) of a batch of preprocessed strokes (N, sample_points, 2).
+    '''
+    x = np.asarray(x, dtype=self.kernel.dtype)
+    #the input projection of all time steps is one matrix product; only the recurrent part runs step by step
+    projected = x @ self.kernel + self.bias
+    h = np.zeros((len(x), self.units), dtype=self.kernel.dtype)
+    c = np.zeros((len(x), self.units), dtype=self.kernel.dtype)
+    u = self.units
+
+    for step in range(x.shape[1]):
+      z = projected[:, step] + h @ self.recurrent_kernel
+      i = _sigmoid(z[:, :u])
+      f = _sigmoid(z[:, u:2 * u])
+      c = f * c + i * np.tanh(z[:, 2 * u:3 * u])
+      h = _sigmoid(z[:, 3 * u:]) * np.tanh(c)
+
+    y = h
+    for ((kernel, bias), activation) in zip(self.dense, self.activations):
+      y = ACTIVATIONS[activation](y @ kernel + bias)
+
+    return y
+
+  def recognise(self, points: Union[list[Point], Stroke]) -> tuple[Template, float]:
+    '''
+      returns (None, None) for strokes with too few points like Recogniser.
+    '''
+    if len(points) <= Config.REQUIRED_POINTS:
+      return (None, None)
+
+    probabilities = self.predict(preprocess(points, self.sample_points)[np.newaxis])[0]
+    best = int(np.argmax(probabilities))
+
+    return (self.templates[best], float(probabilities[best]))
+
+  def recognise_many(self, strokes: list[Union[list[Point], Stroke]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    indices = np.full(len(strokes), -1, dtype=int)
+    names = np.full(len(strokes), None, dtype=object)
+    scores = np.full(len(strokes), np.nan, dtype=float)
+
+    valid = np.array([key for (key, points) in enumerate(strokes) if len(points) > Config.REQUIRED_POINTS], dtype=int)
+
+    if len(valid) == 0:
+      return (indices, names, scores)
+
+    probabilities = self.predict(np.stack([preprocess(strokes[key], self.sample_points) for key in valid]))
+    best = np.argmax(probabilities, axis=1)
+
+    indices[valid] = best
+    names[valid] = np.array([t.name for t in self.templates], dtype=object)[best]
+    scores[valid] = probabilities[np.arange(len(valid)), best]
+
+    return (indices, names, scores)
+
+
+def export_weights(model_path: str=LSTMConfig.MODEL_PATH, labels_path: str=LSTMConfig.LABELS_PATH, path: str=LSTMConfig.WEIGHTS_PATH) -> float:
+  '''
+    writes the weights of the saved keras model to path and returns the largest difference of the probabilities of the numpy forward pass to keras on dataset/test. raises a ValueError if the difference exceeds LSTMConfig.TOLERANCE or the model has layers the runtime does not support.
+    the labels are sorted because the model was trained with a LabelEncoder; labels_model.txt is written from a set and its order is not the class order.
+  '''
+  #tensorflow is only needed for the export
+  os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+  from tensorflow import keras
+
+  model = keras.models.load_model(model_path)
+  lstm = None
+  dense = []
+
+  for layer in model.layers:
+    if isinstance(layer, keras.layers.LSTM):
+      if lstm is not None or len(dense) > 0 or layer.return_sequences or layer.activation.__name__ != "tanh" or layer.recurrent_activation.__name__ != "sigmoid":
+        raise ValueError(f"unsupported lstm layer {layer.name}")
+      lstm = layer.get_weights()
+
+    elif isinstance(layer, keras.layers.Dense):
+      if layer.activation.__name__ not in ACTIVATIONS:
+        raise ValueError(f"unsupported activation {layer.activation.__name__} of {layer.name}")
+      dense.append((layer.get_weights(), layer.activation.__name__))
+
+    elif not isinstance(layer, keras.layers.Dropout):
+      raise ValueError(f"unsupported layer {layer.name}")
+
+  if lstm is None:
+    raise ValueError("the model has no lstm layer")
+
+  with open(labels_path) as f:
+    labels = sorted(ast.literal_eval(f.read()))
+
+  weights = {
+    "lstm_kernel": lstm[0],
+    "lstm_recurrent_kernel": lstm[1],
+    "lstm_bias": lstm[2],
+    "activations": np.array([activation for (_, activation) in dense], dtype=str),
+    "labels": np.array(labels, dtype=str),
+    "sample_points": np.array(model.input_shape[1])
+  }
+
+  for (i, ((kernel, bias), _)) in enumerate(dense):
+    weights[f"dense_kernel_{i}"] = kernel
+    weights[f"dense_bias_{i}"] = bias
+
+  with open(path, "wb") as f:
+    np.savez(f, **weights)
+
+  x, _ = load_dataset(LSTMConfig.TEST_PATH, int(model.input_shape[1]))
+  difference = float(np.abs(LSTMRecogniser(path).predict(x) - model.predict(np.asarray(x), verbose=0)).max())
+
+  if difference > LSTMConfig.TOLERANCE:
+    raise ValueError(f"numpy forward pass differs from keras by {difference}")
+
+  return difference
+
+if __name__ == "__main__":
+  #python lstm_recognizer.py: exports trained_model to lstm_weights.npz (requires tensorflow)
+  difference = export_weights()
+  print(f"exported {LSTMConfig.MODEL_PATH} to {LSTMConfig.WEIGHTS_PATH}, largest difference to keras {difference:.2e}")
@@ -0,0 +1,301 @@
+# one recogniser shared by several applications: python recognition_server.py [--socket PATH | --port PORT] [--store templates.npz]
+import os, json, socket, struct, asyncio, argparse, tempfile, threading
+from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from recognizer import Point, Stroke, Template, Recogniser
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class ServerConfig:
+  SOCKET_PATH = os.path.join(tempfile.gettempdir(), "gesture-recogniser.sock")
+  HOST = "127.0.0.1"
+  TEMPLATE_STORE = os.path.join(SCRIPT_DIR, "templates.npz")
+  #recognise requests that arrive within BATCH_WINDOW seconds of the first one are matched in one recognise_many call
+  BATCH_WINDOW = 0.002
+  MAX_BATCH = 64
+
+class Operation:
+  RECOGNISE = "recognise"
+  RECOGNISE_MANY = "recognise_many"
+  ADD_TEMPLATE = "add_template"
+  TEMPLATES = "templates"
+  STATS = "stats"
+
+#every message is a json object prefixed with its length in bytes
+_HEADER = struct.Struct("!I")
+
+
+def _encode(message: dict) -> bytes:
+  data = json.dumps(message, separators=(",", ":")).encode()
+
+  return _HEADER.pack(len(data)) + data
+
+def _to_lists(points: Union[list[Point], Stroke]) -> list[list[float]]:
+  return [[p.x, p.y] for p in (points.points if isinstance(points, Stroke) else points)]
+
+def _to_points(points: list[list[float]]) -> list[Point]:
+  return [Point(float(x), float(y)) for (x, y) in points]
+
+
+class RecognitionServer:
+  '''
+    serves one Recogniser to many clients over a unix socket or a localhost port. recognise requests of all connections are queued; the first request of a batch waits at most batch_window seconds for others, and the whole batch is matched with one recognise_many call. if that call raises, the strokes are matched one by one, so only the request that fails gets the error.
+    the recogniser only runs on one worker thread, so add_template never runs during a match and the event loop keeps reading requests (which then form the next batch) while a batch is matched.
+  '''
+
+  def __init__(self, recogniser: Recogniser, batch_window: float=ServerConfig.BATCH_WINDOW, max_batch: int=ServerConfig.MAX_BATCH) -> None:
+    self.recogniser = recogniser
+    self.batch_window = batch_window
+    self.max_batch = max_batch
+
+    self.request_count = 0
+    self.batch_count = 0
+
+    self._executor = ThreadPoolExecutor(max_workers=1)
+    self._queue: asyncio.Queue = None
+
+  async def serve(self, path: str=ServerConfig.SOCKET_PATH, port: int=None, host: str=ServerConfig.HOST) -> None:
+    '''
+      serves until cancelled. with port set, the server listens on host:port instead of the unix socket at path.
+    '''
+    self._queue = asyncio.Queue()
+    batcher = asyncio.create_task(self._batch())
+
+    if port is not None:
+      server = await asyncio.start_server(self._handle, host, port)
+    else:
+      #a socket file left behind by a server that was killed would make the bind fail
+      if os.path.exists(path):
+        os.remove(path)
+      server = await asyncio.start_unix_server(self._handle, path)
+
+    try:
+      async with server:
+        await server.serve_forever()
+    finally:
+      batcher.cancel()
+      self._executor.shutdown(wait=False)
+
+      if port is None and os.path.exists(path):
+        os.remove(path)
+
+  async def _run(self, function, *args):
+    return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+  async def _batch(self) -> None:
+    loop = asyncio.get_running_loop()
+
+    while True:
+      batch = [await self._queue.get()]
+      deadline = loop.time() + self.batch_window
+
+      while len(batch) < self.max_batch:
+        #requests that are already queued join the batch even when the window is over
+        if not self._queue.empty():
+          batch.append(self._queue.get_nowait())
+          continue
+
+        timeout = deadline - loop.time()
+
+        if timeout <= 0.0:
+          break
+
+        try:
+          batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+        except asyncio.TimeoutError:
+          break
+
+      try:
+        self._resolve(batch, await self._run(self.recogniser.recognise_many, [points for (points, _) in batch]))
+      except Exception:
+        #one bad stroke must not fail the strokes of other clients, so the batch is matched again stroke by stroke
+        for entry in batch:
+          try:
+            self._resolve([entry], await self._run(self.recogniser.recognise_many, [entry[0]]))
+          except Exception as e:
+            if not entry[1].done():
+              entry[1].set_exception(e)
+
+      self.batch_count += 1
+
+  def _resolve(self, batch: list[tuple[list[Point], asyncio.Future]], results: tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+    indices, names, scores = results
+
+    for ((_, future), index, name, score) in zip(batch, indices.tolist(), names.tolist(), scores.tolist()):
+      if not future.done():
+        future.set_result({"index": index, "name": name, "score": None if np.isnan(score) else score})
+
+  async def _recognise(self, points: list[Point]) -> dict:
+    future = asyncio.get_running_loop().create_future()
+    self.request_count += 1
+    await self._queue.put((points, future))
+
+    return await future
+
+  async def _respond(self, request: dict) -> dict:
+    operation = request.get("operation")
+
+    if operation == Operation.RECOGNISE:
+      return await self._recognise(_to_points(request["points"]))
+
+    if operation == Operation.RECOGNISE_MANY:
+      #every stroke is queued on its own so that it can share a batch with the requests of other clients
+      results = await asyncio.gather(*[self._recognise(_to_points(points)) for points in request["strokes"]])
+      return {"results": results}
+
+    if operation == Operation.ADD_TEMPLATE:
+      return {"added": await self._run(self.recogniser.add_template, request["name"], _to_points(request["points"]))}
+
+    if operation == Operation.TEMPLATES:
+      return {"names": [t.name for t in self.recogniser.templates]}
+
+    if operation == Operation.STATS:
+      return {"requests": self.request_count, "batches": self.batch_count}
+
+    raise ValueError(f"unknown operation: {operation}")
+
+  async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+      while True:
+        try:
+          header = await reader.readexactly(_HEADER.size)
+          data = await reader.readexactly(_HEADER.unpack(header)[0])
+        except asyncio.IncompleteReadError:
+          return
+
+        #a malformed request or a failing operation is answered with an error; the connection stays open for the next request
+        try:
+          response = await self._respond(json.loads(data))
+        except Exception as e:
+          response = {"error": f"{type(e).__name__}: {e}"}
+
+        writer.write(_encode(response))
+        await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      writer.close()
+
+
+class RecognitionClient:
+  '''
+    drop-in for Recogniser (see RecogniserBackend) that lets a RecognitionServer recognise the strokes. the connection is opened on the first request and reused; a lost connection is opened again once per request. a lock keeps the requests of different threads (e.g. the RecognitionWorker and the pyglet thread) apart.
+    templates only carry index and name, like the templates of LSTMRecogniser.
+  '''
+
+  def __init__(self, path: str=ServerConfig.SOCKET_PATH, port: int=None, host: str=ServerConfig.HOST) -> None:
+    self.path = path
+    self.port = port
+    self.host = host
+
+    self._socket: socket.socket = None
+    self._lock = threading.Lock()
+    self._templates: list[Template] = None
+
+  def _connect(self) -> socket.socket:
+    if self.port is not None:
+      connection = socket.create_connection((self.host, self.port))
+      connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    else:
+      connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      connection.connect(self.path)
+
+    return connection
+
+  def _receive(self, size: int) -> bytes:
+    data = bytearray()
+
+    while len(data) < size:
+      chunk = self._socket.recv(size - len(data))
+
+      if len(chunk) == 0:
+        raise ConnectionError("recognition server closed the connection")
+
+      data.extend(chunk)
+
+    return bytes(data)
+
+  def _request(self, request: dict) -> dict:
+    with self._lock:
+      for attempt in range(2):
+        try:
+          if self._socket is None:
+            self._socket = self._connect()
+
+          self._socket.sendall(_encode(request))
+          response = json.loads(self._receive(_HEADER.unpack(self._receive(_HEADER.size))[0]))
+          break
+        except ConnectionError:
+          self.close()
+
+          if attempt == 1:
+            raise
+
+    if "error" in response:
+      raise ValueError(f"recognition server: {response['error']}")
+
+    return response
+
+  def close(self) -> None:
+    if self._socket is not None:
+      self._socket.close()
+      self._socket = None
+
+  @property
+  def templates(self) -> list[Template]:
+    if self._templates is None:
+      self._templates = [Template(index, name, []) for (index, name) in enumerate(self._request({"operation": Operation.TEMPLATES})["names"])]
+
+    return self._templates
+
+  def _template(self, index: int, name: str) -> Template:
+    #another client may have added templates since the list was fetched
+    if index >= len(self.templates):
+      self._templates = None
+
+    return self.templates[index] if index < len(self.templates) else Template(index, name, [])
+
+  def stats(self) -> dict:
+    return self._request({"operation": Operation.STATS})
+
+  def recognise(self, points: Union[list[Point], Stroke]) -> tuple[Template, float]:
+    result = self._request({"operation": Operation.RECOGNISE, "points": _to_lists(points)})
+
+    if result["index"] < 0:
+      return (None, None)
+
+    return (self._template(result["index"], result["name"]), result["score"])
+
+  def recognise_many(self, strokes: list[Union[list[Point], Stroke]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    results = self._request({"operation": Operation.RECOGNISE_MANY, "strokes": [_to_lists(points) for points in strokes]})["results"]
+
+    indices = np.array([result["index"] for result in results], dtype=int).reshape(-1)
+    names = np.full(len(results), None, dtype=object)
+    names[:] = [result["name"] for result in results]
+    scores = np.array([np.nan if result["score"] is None else result["score"] for result in results], dtype=float).reshape(-1)
+
+    return (indices, names, scores)
+
+  def add_template(self, name: str, points: list[Point]) -> bool:
+    self._templates = None
+
+    return self._request({"operation": Operation.ADD_TEMPLATE, "name": name, "points": _to_lists(points)})["added"]
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="serves one $1 recogniser to the applications on this machine")
+  parser.add_argument("--socket", default=ServerConfig.SOCKET_PATH, help="path of the unix socket")
+  parser.add_argument("--port", type=int, help="listen on localhost:PORT instead of the unix socket")
+  parser.add_argument("--store", default=ServerConfig.TEMPLATE_STORE, help="template store that is loaded or built on start")
+  parser.add_argument("--window", type=float, default=ServerConfig.BATCH_WINDOW, help="seconds a request waits for others to be matched with")
+  args = parser.parse_args()
+
+  server = RecognitionServer(Recogniser(template_store=args.store), args.window)
+  print(f"serving {len(server.recogniser.templates)} templates on {args.socket if args.port is None else f'{ServerConfig.HOST}:{args.port}'}")
+
+  try:
+    asyncio.run(server.serve(args.socket, args.port))
+  except KeyboardInterrupt:
+    pass
@@ -0,0 +1,109 @@
+# background recognition so that the pyglet event loop never waits for the recogniser
+import threading, time
+from collections import deque
+
+from recognizer import Stroke, Template
+from recognizer_backend import RecogniserBackend
+
+
+class RecognitionResult:
+  def __init__(self, stroke_id: int, stroke: Stroke, final: bool, result: tuple[Template, float], duration: float, error: Exception=None) -> None:
+    self.stroke_id = stroke_id
+    #the copy of the stroke that was recognised
+    self.stroke = stroke
+    #points added to the stroke when it was submitted, see Stroke.added_count
+    self.point_count = stroke.added_count
+    self.final = final
+    self.result = result
+    self.duration = duration
+    #set if the recogniser raised (e.g. RecognitionClient without a server); result is then (None, None)
+    self.error = error
+
+
+class RecognitionWorker:
+  '''
+    runs recogniser.recognise (preview_recogniser.recognise for previews) on a daemon thread. only the newest preview job is kept: a preview that is replaced before the worker picks it up is dropped, so the worker never falls behind a stroke that is still being drawn. final jobs are never dropped and run before any preview.
+    results are collected with poll() from the pyglet thread, e.g. in a function scheduled with schedule_interval. if the recogniser raises, the result carries the exception in error.
+  '''
+
+  def __init__(self, recogniser: RecogniserBackend, preview_recogniser: RecogniserBackend=None) -> None:
+    self.recogniser = recogniser
+    #previews may use a cheaper recogniser, e.g. the fast one of a CascadeRecogniser so that unfinished strokes do not count as escalations
+    self.preview_recogniser = recogniser if preview_recogniser is None else preview_recogniser
+    self.dropped_count = 0
+
+    self._condition = threading.Condition()
+    self._pending: tuple[int, Stroke, bool] = None
+    self._finals: deque[tuple[int, Stroke, bool]] = deque()
+    self._results: deque[RecognitionResult] = deque()
+    self._running = True
+    self._busy = False
+
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def submit(self, stroke_id: int, stroke: Stroke, final: bool=False) -> None:
+    '''
+      the stroke is copied so that the caller can keep adding points while the job waits or runs.
+    '''
+    with self._condition:
+      if self._pending is not None:
+        self.dropped_count += 1
+        self._pending = None
+
+      if final:
+        self._finals.append((stroke_id, stroke.copy(), final))
+      else:
+        self._pending = (stroke_id, stroke.copy(), final)
+
+      #wait() may block on the same condition
+      self._condition.notify_all()
+
+  def poll(self) -> list[RecognitionResult]:
+    results = []
+
+    while len(self._results) > 0:
+      results.append(self._results.popleft())
+
+    return results
+
+  def wait(self, timeout: float=None) -> bool:
+    '''
+      blocks until every submitted job is recognised and its result can be polled. returns False if timeout seconds passed before.
+    '''
+    with self._condition:
+      return self._condition.wait_for(lambda: not self._busy and self._pending is None and len(self._finals) == 0, timeout)
+
+  def stop(self) -> None:
+    with self._condition:
+      self._running = False
+      self._condition.notify_all()
+
+  def _run(self) -> None:
+    while True:
+      with self._condition:
+        while self._running and self._pending is None and len(self._finals) == 0:
+          self._condition.wait()
+
+        if not self._running:
+          return
+
+        if len(self._finals) > 0:
+          stroke_id, stroke, final = self._finals.popleft()
+        else:
+          stroke_id, stroke, final = self._pending
+          self._pending = None
+
+        self._busy = True
+
+      #an exception must not end the thread, or no result would ever arrive again
+      try:
+        t1 = time.perf_counter()
+        result = (self.recogniser if final else self.preview_recogniser).recognise(stroke)
+        self._results.append(RecognitionResult(stroke_id, stroke, final, result, time.perf_counter() - t1))
+      except Exception as e:
+        self._results.append(RecognitionResult(stroke_id, stroke, final, (None, None), time.perf_counter() - t1, e))
+      finally:
+        with self._condition:
+          self._busy = False
+          self._condition.notify_all()
@@ -1,8 +1,16 @@
 # $1 gesture recognizer
 #file is based on https://depts.washington.edu/acelab/proj/dollar/dollar.pdf
-import math
+import math, os, time
+from typing import Union, Callable
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 class Point:
+  __slots__ = ("x", "y")
+
   def __init__(self, x: float, y: float) -> None:
     self.x = x
     self.y = y
@@ -17,12 +25,35 @@ class Config:
   PHI = 0.5 * (-1.0 + math.sqrt(5.0))
   HALF_DIAGONAL = 0.5 * math.sqrt(SIZE * SIZE + SIZE * SIZE)
   REQUIRED_POINTS = 3
+  #templates scored per step while pruning; PRUNE_EPSILON absorbs rounding so that pruning never drops a template the exhaustive search would pick
+  PRUNE_BLOCK = 16
+  PRUNE_EPSILON = 1e-9
+  #upper bound of (queries x templates x SAMPLE_POINTS) elements that recognise_many scores in one vectorised step
+  BATCH_ELEMENTS = 2 ** 22
+
+class Matcher:
+  GOLDEN_SECTION = "golden_section"
+  PROTRACTOR = "protractor"
+
+class Direction:
+  #add_template stores every template twice, as drawn and mirrored along the x-axis
+  MIRRORED_TEMPLATES = "mirrored_templates"
+  #every template is stored once; the query is matched as drawn and mirrored
+  MIRRORED_QUERY = "mirrored_query"
 
 class Template:
-  def __init__(self, index: int, name: str, points: list[Point]) -> None:
+  def __init__(self, index: int, name: str, points: Union[list[Point], np.ndarray]) -> None:
     self.index = index
     self.name = name
-    self.points = points
+    self._points = points
+
+  @property
+  def points(self) -> list[Point]:
+    #templates keep their converted points as array; the point objects are created on first access
+    if isinstance(self._points, np.ndarray):
+      self._points = [Point(x, y) for (x, y) in self._points.tolist()]
+
+    return self._points
 
 def _distance(a: Point, b: Point) -> float:
   d_x = b.x - a.x
@@ -30,233 +61,779 @@ def _distance(a: Point, b: Point) -> float:
 
   return math.sqrt(d_x * d_x + d_y * d_y)
 
-def _resample(points: list[Point], n: int) -> list[Point]:
-  I = _path_length(points) / (n - 1)
-  D = 0.0
+def _bounding_box(points: list[Point]) -> tuple[Point, Point]:
+  l_x = [p.x for p in points]
+  l_y = [p.y for p in points]
 
-  new_points: list[Point] = []
-  new_points.append(points[0])
+  min_x = min(l_x)
+  max_x = max(l_x)
+  min_y = min(l_y)
+  max_y = max(l_y)
+  
+  return (Point(min_x, min_y), Point(max_x, max_y))
 
-  for (key, _) in enumerate(points):
-    if key == 0:
-      continue
-    d = _distance(points[key - 1], points[key])
+def _to_array(points: list[Point]) -> np.ndarray:
+  return np.array([(p.x, p.y) for p in points], dtype=float)
 
-    if (D + d) >= I:
-      q_x = points[key - 1].x + ((I - D) / d) * (points[key].x - points[key - 1].x)
-      q_y = points[key - 1].y + ((I -D) / d) * (points[key].y - points[key - 1].y)
-      
-      new_point = Point(q_x, q_y)
-      new_points.append(new_point)
-      #need to insert the updated point into the initial list so that the next iteration can work with the updated point
-      points.insert(key, new_point)
+def _distances_at_angles(points: np.ndarray, templates: np.ndarray, thetas: np.ndarray) -> np.ndarray:
+  '''
+    rotates the query (N, 2) by one angle per template and returns the path distance to every template of the (T, N, 2) stack at once.
+    a batch of queries (Q, N, 2) with angles (Q, T) is scored in the same way and returns (Q, T) distances.
+  '''
+  c = points.mean(axis=-2)
+  d_x = (points[..., 0] - c[..., 0:1])[..., np.newaxis, :]
+  d_y = (points[..., 1] - c[..., 1:2])[..., np.newaxis, :]
+  sin = np.sin(thetas)[..., np.newaxis]
+  cos = np.cos(thetas)[..., np.newaxis]
 
-      D = 0.0
+  q_x = d_x * cos - d_y * sin + c[..., np.newaxis, 0:1]
+  q_y = d_x * sin + d_y * cos + c[..., np.newaxis, 1:2]
 
-    else:
-      D = D + d
+  return np.hypot(q_x - templates[..., 0], q_y - templates[..., 1]).mean(axis=-1)
 
-  #https://depts.washington.edu/acelab/proj/dollar/dollar.js; addition to the pseudo code; sometimes the sample is one element too short
-  if len(new_points) == n - 1:
-    new_points.append(points[-1])
-  
-  return new_points
+def _distances_at_best_angle(points: np.ndarray, templates: np.ndarray, phi: float, theta_neg: float, theta_pos: float, theta_delta: float, evaluations: np.ndarray=None) -> np.ndarray:
+  '''
+    golden section search for the best angle of the paper running for all templates (and all queries of a batch) in lockstep. every template keeps its own search interval, so the branch decisions and therefore the results are the same as searching template by template.
+    evaluations: if given, the number of angles each template was scored at is added to it.
+  '''
+  shape = points.shape[:-2] + (templates.shape[-3],)
+  neg = np.full(shape, theta_neg, dtype=float)
+  pos = np.full(shape, theta_pos, dtype=float)
+
+  x_1 = phi * neg + (1.0 - phi) * pos
+  f_1 = _distances_at_angles(points, templates, x_1)
+
+  x_2 = (1.0 - phi) * neg + phi * pos
+  f_2 = _distances_at_angles(points, templates, x_2)
 
-def _path_length(points: list[Point]) -> float:
-  d = 0.0
+  active = np.abs(pos - neg) > theta_delta
+
+  if evaluations is not None:
+    evaluations += 2
+
+  while active.any():
+    if evaluations is not None:
+      evaluations += active
+
+    lower = active & (f_1 < f_2)
+    upper = active & ~(f_1 < f_2)
+
+    pos = np.where(lower, x_2, pos)
+    neg = np.where(upper, x_1, neg)
+
+    new_x_1 = np.where(lower, phi * neg + (1.0 - phi) * pos, np.where(upper, x_2, x_1))
+    new_x_2 = np.where(lower, x_1, np.where(upper, (1.0 - phi) * neg + phi * pos, x_2))
+
+    f = _distances_at_angles(points, templates, np.where(lower, new_x_1, new_x_2))
+
+    f_1, f_2 = np.where(lower, f, np.where(upper, f_2, f_1)), np.where(lower, f_1, np.where(upper, f, f_2))
+    x_1, x_2 = new_x_1, new_x_2
+
+    active = np.abs(pos - neg) > theta_delta
+
+  return np.minimum(f_1, f_2)
+
+def _lower_bounds(points: np.ndarray, templates: np.ndarray) -> np.ndarray:
+  '''
+    rotating the query around its centroid c keeps the distance of every point to c. by the triangle inequality, | |p - c| - |t - c| | <= |rotated p - t| for any angle, so the mean of it bounds the result of the golden section search of every template from below.
+  '''
+  c = points.mean(axis=0)
+  r_p = np.hypot(points[:, 0] - c[0], points[:, 1] - c[1])
+  r_t = np.hypot(templates[:, :, 0] - c[0], templates[:, :, 1] - c[1])
+
+  return np.abs(r_t - r_p).mean(axis=1)
+
+def _mirror_lower_bounds(points: np.ndarray, templates: np.ndarray) -> np.ndarray:
+  '''
+    _lower_bounds that holds for the query and its mirror at once. the distances are taken from a = (0, c_y) on the mirror axis instead of from c, so they are the same for both directions. as the rotation keeps |p - c|, |rotated p - a| differs from |p - a| by at most 2 |c - a| = 2 |c_x|, which is subtracted from the bound.
+  '''
+  c_x, c_y = points.mean(axis=0)
+  r_p = np.hypot(points[:, 0], points[:, 1] - c_y)
+  r_t = np.hypot(templates[:, :, 0], templates[:, :, 1] - c_y)
+
+  return np.abs(r_t - r_p).mean(axis=1) - 2.0 * abs(c_x)
+
+def _with_mirror(points: np.ndarray) -> np.ndarray:
+  '''
+    the converted points (..., N, 2) and their mirror along the x-axis stacked on a new axis, (..., 2, N, 2). the mirrored query has the same distance to a template as the query to the mirrored template.
+  '''
+  return np.stack((points, points * (-1.0, 1.0)), axis=-3)
+
+def _vectorize(points: np.ndarray) -> np.ndarray:
+  '''
+    protractor template vector: the converted points centered and normalised to unit length. see https://dl.acm.org/doi/10.1145/1753326.1753654
+  '''
+  centered = points - points.mean(axis=-2, keepdims=True)
+
+  return centered / np.linalg.norm(centered, axis=(-2, -1), keepdims=True)
+
+def _optimal_angles(vector: np.ndarray, templates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  '''
+    closed form solution of protractor. returns the rotation of the query that best aligns it with each template of the (T, N, 2) stack of unit vectors and the cosine similarity at that rotation.
+  '''
+  a = vector[..., 0] @ templates[:, :, 0].T + vector[..., 1] @ templates[:, :, 1].T
+  b = vector[..., 0] @ templates[:, :, 1].T - vector[..., 1] @ templates[:, :, 0].T
+
+  return (np.arctan2(b, a), np.hypot(a, b))
+
+def _resample_array(points: np.ndarray, n: int, lengths: np.ndarray=None) -> np.ndarray:
+  '''
+    n points with equal path distance (the resample step of the paper) for a (N, 2) array, as one interpolation over the cumulative path length of the points. lengths can be passed if they are already known.
+  '''
+  if lengths is None:
+    steps = np.diff(points, axis=0)
+    lengths = np.concatenate(([0.0], np.cumsum(np.hypot(steps[:, 0], steps[:, 1]))))
+
+  positions = np.linspace(lengths[0], lengths[-1], n)
+
+  return np.stack((np.interp(positions, lengths, points[:, 0]), np.interp(positions, lengths, points[:, 1])), axis=1)
+
+def _normalize(points: np.ndarray) -> np.ndarray:
+  '''
+    the rotation by the indicative angle, scaling to Config.SIZE and translation to Config.ORIGIN of the paper as one affine transform of an already resampled (N, 2) array.
+    rotating about the centroid and translating the centroid to ORIGIN afterwards only differ from rotating about any other point by a translation, so the points are rotated as they are. the rotated points give the bounding box for the scale; scale and translation are then applied in place.
+  '''
+  c = points.mean(axis=0)
+  rad = math.atan2(c[1] - points[0, 1], c[0] - points[0, 0])
+  sin = math.sin(-rad)
+  cos = math.cos(-rad)
+
+  transformed = points @ np.array([[cos, sin], [-sin, cos]])
+  transformed *= Config.SIZE / (transformed.max(axis=0) - transformed.min(axis=0))
+  transformed += (Config.ORIGIN.x, Config.ORIGIN.y) - transformed.mean(axis=0)
+
+  return transformed
+
+class Stroke:
+  '''
+    accumulates a stroke while it is drawn. the bounding box is updated with every added point, and the cumulative path length of each point is kept so that resampling at the end is a single linear interpolation instead of a walk over the whole stroke.
+    with max_points set, the stroke is a ring buffer that keeps the newest max_points points; evicted points are counted in evicted_count.
+  '''
+
+  def __init__(self, max_points: int=None) -> None:
+    self.max_points = max_points
+    self.points: deque[Point] = deque(maxlen=max_points)
+    self.evicted_count = 0
+    #cumulative path length since the first point ever added, also for evicted points
+    self._total = 0.0
+    self._lengths: deque[float] = deque(maxlen=max_points)
+    self._min = Point(float("infinity"), float("infinity"))
+    self._max = Point(float("-infinity"), float("-infinity"))
+    #an evicted point may have defined the bounding box; it is then recomputed when needed
+    self._box_outdated = False
+
+  def __len__(self) -> int:
+    return len(self.points)
+
+  @property
+  def added_count(self) -> int:
+    #unlike len(), this keeps growing once the ring buffer is full
+    return len(self.points) + self.evicted_count
+
+  def add(self, point: Point) -> None:
+    if len(self.points) > 0:
+      self._total += _distance(self.points[-1], point)
+
+    if self.max_points is not None and len(self.points) == self.max_points:
+      evicted = self.points[0]
+      self.evicted_count += 1
+      self._box_outdated = self._box_outdated or evicted.x in (self._min.x, self._max.x) or evicted.y in (self._min.y, self._max.y)
+
+    self.points.append(point)
+    self._lengths.append(self._total)
+    self._min = Point(min(self._min.x, point.x), min(self._min.y, point.y))
+    self._max = Point(max(self._max.x, point.x), max(self._max.y, point.y))
+
+  def copy(self) -> "Stroke":
+    stroke = Stroke(self.max_points)
+    stroke.points = self.points.copy()
+    stroke.evicted_count = self.evicted_count
+    stroke._total = self._total
+    stroke._lengths = self._lengths.copy()
+    stroke._min = self._min
+    stroke._max = self._max
+    stroke._box_outdated = self._box_outdated
+
+    return stroke
+
+  def bounding_box(self) -> tuple[Point, Point]:
+    if self._box_outdated:
+      self._min, self._max = _bounding_box(self.points)
+      self._box_outdated = False
+
+    return (self._min, self._max)
+
+  def is_valid(self) -> bool:
+    '''
+      same checks as _is_valid without looking at the points again.
+    '''
+    if len(self.points) <= Config.REQUIRED_POINTS:
+      return False
 
-  for i in range(1, len(points)):
-    d = d + _distance(points[i - 1], points[i])
+    p_min, p_max = self.bounding_box()
 
-  return d
+    return p_min.x != p_max.x and p_min.y != p_max.y
 
-def _indicative_angle(points: list[Point]) -> float:
-  c = _centroid(points)
+  def resample(self, n: int) -> np.ndarray:
+    '''
+      n points with equal path distance like _resample_array, returned as (n, 2) array. the stroke itself is not changed.
+    '''
+    return _resample_array(_to_array(self.points), n, np.array(self._lengths))
+
+def _is_valid(points: np.ndarray) -> bool:
+  '''
+    a stroke needs more than Config.REQUIRED_POINTS points and a bounding box with width and height to be recognised.
+  '''
+  return len(points) > Config.REQUIRED_POINTS and bool((points.max(axis=0) != points.min(axis=0)).all())
+
+def _prepare(points: Union[list[Point], Stroke]) -> Union[np.ndarray, None]:
+  '''
+    converts a stroke given as list of points or as Stroke to the (SAMPLE_POINTS, 2) array the matchers work with. returns None if the stroke cannot be recognised.
+  '''
+  if isinstance(points, Stroke):
+    if not points.is_valid():
+      return None
+
+    return _normalize(points.resample(Config.SAMPLE_POINTS))
+
+  points = _to_array(points)
+
+  if not _is_valid(points):
+    return None
+
+  return _normalize(_resample_array(points, Config.SAMPLE_POINTS))
+
+def _prepare_profiled(points: Union[list[Point], Stroke], profiler: "Profiler") -> Union[np.ndarray, None]:
+  '''
+    _prepare with the time of every stage recorded by the profiler.
+  '''
+  if isinstance(points, Stroke):
+    with profiler.stage("is_valid"):
+      valid = points.is_valid()
+
+    if not valid:
+      return None
+
+    with profiler.stage("resample"):
+      resampled = points.resample(Config.SAMPLE_POINTS)
+
+    with profiler.stage("normalize"):
+      return _normalize(resampled)
+
+  with profiler.stage("is_valid"):
+    points = _to_array(points)
+    valid = _is_valid(points)
+
+  if not valid:
+    return None
+
+  with profiler.stage("resample"):
+    resampled = _resample_array(points, Config.SAMPLE_POINTS)
+
+  with profiler.stage("normalize"):
+    return _normalize(resampled)
+
+class Profiler:
+  '''
+    records the time spent in each stage of recognise/recognise_many and how often each template was scored at an angle, per template and per query.
+    a Recogniser only measures if it has a profiler. the stats of recognise_many in a process pool stay in the worker processes.
+    dump_interval: if set, dump is called with report() after a query when at least dump_interval seconds passed since the last dump.
+  '''
+  #upper edges of the histogram bins: durations from 1us to 1s, evaluations per query in powers of 2
+  TIME_BINS = 10.0 ** np.arange(-6.0, 0.25, 0.25)
+  EVALUATION_BINS = 2.0 ** np.arange(0, 24)
+
+  def __init__(self, dump_interval: float=None, dump: Callable[[str], None]=print) -> None:
+    self.dump_interval = dump_interval
+    self.dump = dump
+    self.reset()
+
+  def reset(self) -> None:
+    self.stage_counts: dict[str, int] = {}
+    self.stage_totals: dict[str, float] = {}
+    self.stage_histograms: dict[str, np.ndarray] = {}
+    self.query_count = 0
+    self.query_histogram = np.zeros(len(self.EVALUATION_BINS) + 1, dtype=np.int64)
+    self.template_evaluations = np.zeros(0, dtype=np.int64)
+
+    self._query_evaluations = 0
+    self._last_dump = time.perf_counter()
+
+  def add_time(self, stage: str, duration: float) -> None:
+    if stage not in self.stage_counts:
+      self.stage_counts[stage] = 0
+      self.stage_totals[stage] = 0.0
+      self.stage_histograms[stage] = np.zeros(len(self.TIME_BINS) + 1, dtype=np.int64)
+
+    self.stage_counts[stage] += 1
+    self.stage_totals[stage] += duration
+    self.stage_histograms[stage][np.searchsorted(self.TIME_BINS, duration)] += 1
+
+  @contextmanager
+  def stage(self, name: str):
+    t1 = time.perf_counter()
+
+    try:
+      yield
+    finally:
+      self.add_time(name, time.perf_counter() - t1)
+
+  def count_evaluations(self, templates: np.ndarray, evaluations: np.ndarray) -> None:
+    '''
+      evaluations of the templates with the given indices, (T,) for a query or (Q, T) for a batch.
+    '''
+    templates = np.broadcast_to(templates, evaluations.shape)
 
-  return math.atan2(c.y - points[0].y, c.x - points[0].x)
+    if templates.size > 0 and templates.max() >= len(self.template_evaluations):
+      self.template_evaluations = np.pad(self.template_evaluations, (0, int(templates.max()) + 1 - len(self.template_evaluations)))
 
+    np.add.at(self.template_evaluations, templates, evaluations)
+    self._query_evaluations = self._query_evaluations + evaluations.sum(axis=-1)
 
-def _centroid(points: list[Point]) -> Point:
-  l_x = [p.x for p in points]
-  l_y = [p.y for p in points]
+  def end_queries(self) -> None:
+    '''
+      closes the query (or the batch of queries) whose evaluations were counted since the last call.
+    '''
+    evaluations = np.atleast_1d(self._query_evaluations)
+    self._query_evaluations = 0
 
-  return Point(sum(l_x) / len(points), sum(l_y) / len(points))
+    self.query_count += len(evaluations)
+    np.add.at(self.query_histogram, np.searchsorted(self.EVALUATION_BINS, evaluations), 1)
 
-def _rotate_by(points: list[Point], theta: float) -> list[Point]:
-  new_points: list[Point] = []
-  c = _centroid(points=points) 
-  sin = math.sin(theta)
-  cos = math.cos(theta)
+    if self.dump_interval is not None and time.perf_counter() - self._last_dump >= self.dump_interval:
+      self._last_dump = time.perf_counter()
+      self.dump(self.report())
 
-  for p in points:
-    q_x = (p.x - c.x) * cos - (p.y - c.y) * sin + c.x
-    q_y = (p.x - c.x) * sin + (p.y - c.y) * cos + c.y
+  def stats(self) -> dict:
+    '''
+      totals and histograms. histogram[i] counts the values up to bins[i] (and above the previous bin); the last entry counts the values above the last bin.
+    '''
+    return {
+      "stages": {name: {
+        "count": self.stage_counts[name],
+        "total": self.stage_totals[name],
+        "mean": self.stage_totals[name] / self.stage_counts[name],
+        "histogram": self.stage_histograms[name].copy()
+      } for name in self.stage_counts},
+      "time_bins": self.TIME_BINS,
+      "queries": self.query_count,
+      "evaluations": int(self.template_evaluations.sum()),
+      "evaluations_per_template": self.template_evaluations.copy(),
+      "evaluations_per_query": self.query_histogram.copy(),
+      "evaluation_bins": self.EVALUATION_BINS
+    }
+
+  def report(self) -> str:
+    lines = [f"{name}: {self.stage_counts[name]} calls, {self.stage_totals[name] * 1000:.2f}ms total, {self.stage_totals[name] / self.stage_counts[name] * 1e6:.1f}us mean" for name in self.stage_counts]
+    evaluations = int(self.template_evaluations.sum())
+    lines.append(f"{self.query_count} queries, {evaluations} distance evaluations ({evaluations / max(self.query_count, 1):.1f} per query, {np.count_nonzero(self.template_evaluations)} templates scored)")
+
+    return "\n".join(lines)
 
-    new_points.append(Point(q_x, q_y))
-  
-  return new_points
+predefined_gestures: dict[str, list[Point]] = {
+  "triangle": [Point(137,139),Point(135,141),Point(133,144),Point(132,146),Point(130,149),Point(128,151),Point(126,155),Point(123,160),Point(120,166),Point(116,171),Point(112,177),Point(107,183),Point(102,188),Point(100,191),Point(95,195),Point(90,199),Point(86,203),Point(82,206),Point(80,209),Point(75,213),Point(73,213),Point(70,216),Point(67,219),Point(64,221),Point(61,223),Point(60,225),Point(62,226),Point(65,225),Point(67,226),Point(74,226),Point(77,227),Point(85,229),Point(91,230),Point(99,231),Point(108,232),Point(116,233),Point(125,233),Point(134,234),Point(145,233),Point(153,232),Point(160,233),Point(170,234),Point(177,235),Point(179,236),Point(186,237),Point(193,238),Point(198,239),Point(200,237),Point(202,239),Point(204,238),Point(206,234),Point(205,230),Point(202,222),Point(197,216),Point(192,207),Point(186,198),Point(179,189),Point(174,183),Point(170,178),Point(164,171),Point(161,168),Point(154,160),Point(148,155),Point(143,150),Point(138,148),Point(136,148)],
+	
+  "x": [Point(87,142),Point(89,145),Point(91,148),Point(93,151),Point(96,155),Point(98,157),Point(100,160),Point(102,162),Point(106,167),Point(108,169),Point(110,171),Point(115,177),Point(119,183),Point(123,189),Point(127,193),Point(129,196),Point(133,200),Point(137,206),Point(140,209),Point(143,212),Point(146,215),Point(151,220),Point(153,222),Point(155,223),Point(157,225),Point(158,223),Point(157,218),Point(155,211),Point(154,208),Point(152,200),Point(150,189),Point(148,179),Point(147,170),Point(147,158),Point(147,148),Point(147,141),Point(147,136),Point(144,135),Point(142,137),Point(140,139),Point(135,145),Point(131,152),Point(124,163),Point(116,177),Point(108,191),Point(100,206),Point(94,217),Point(91,222),Point(89,225),Point(87,226),Point(87,224)],
 
-def _bounding_box(points: list[Point]) -> tuple[Point, Point]:
-  l_x = [p.x for p in points]
-  l_y = [p.y for p in points]
+  "rectangle": [Point(78,149),Point(78,153),Point(78,157),Point(78,160),Point(79,162),Point(79,164),Point(79,167),Point(79,169),Point(79,173),Point(79,178),Point(79,183),Point(80,189),Point(80,193),Point(80,198),Point(80,202),Point(81,208),Point(81,210),Point(81,216),Point(82,222),Point(82,224),Point(82,227),Point(83,229),Point(83,231),Point(85,230),Point(88,232),Point(90,233),Point(92,232),Point(94,233),Point(99,232),Point(102,233),Point(106,233),Point(109,234),Point(117,235),Point(123,236),Point(126,236),Point(135,237),Point(142,238),Point(145,238),Point(152,238),Point(154,239),Point(165,238),Point(174,237),Point(179,236),Point(186,235),Point(191,235),Point(195,233),Point(197,233),Point(200,233),Point(201,235),Point(201,233),Point(199,231),Point(198,226),Point(198,220),Point(196,207),Point(195,195),Point(195,181),Point(195,173),Point(195,163),Point(194,155),Point(192,145),Point(192,143),Point(192,138),Point(191,135),Point(191,133),Point(191,130),Point(190,128),Point(188,129),Point(186,129),Point(181,132),Point(173,131),Point(162,131),Point(151,132),Point(149,132),Point(138,132),Point(136,132),Point(122,131),Point(120,131),Point(109,130),Point(107,130),Point(90,132),Point(81,133),Point(76,133)],
 
-  min_x = min(l_x)
-  max_x = max(l_x)
-  min_y = min(l_y)
-  max_y = max(l_y)
-  
-  return (Point(min_x, min_y), Point(max_x, max_y))
+  "circle": [Point(127,141),Point(124,140),Point(120,139),Point(118,139),Point(116,139),Point(111,140),Point(109,141),Point(104,144),Point(100,147),Point(96,152),Point(93,157),Point(90,163),Point(87,169),Point(85,175),Point(83,181),Point(82,190),Point(82,195),Point(83,200),Point(84,205),Point(88,213),Point(91,216),Point(96,219),Point(103,222),Point(108,224),Point(111,224),Point(120,224),Point(133,223),Point(142,222),Point(152,218),Point(160,214),Point(167,210),Point(173,204),Point(178,198),Point(179,196),Point(182,188),Point(182,177),Point(178,167),Point(170,150),Point(163,138),Point(152,130),Point(143,129),Point(140,131),Point(129,136),Point(126,139)],
+
+  "check": [Point(91,185),Point(93,185),Point(95,185),Point(97,185),Point(100,188),Point(102,189),Point(104,190),Point(106,193),Point(108,195),Point(110,198),Point(112,201),Point(114,204),Point(115,207),Point(117,210),Point(118,212),Point(120,214),Point(121,217),Point(122,219),Point(123,222),Point(124,224),Point(126,226),Point(127,229),Point(129,231),Point(130,233),Point(129,231),Point(129,228),Point(129,226),Point(129,224),Point(129,221),Point(129,218),Point(129,212),Point(129,208),Point(130,198),Point(132,189),Point(134,182),Point(137,173),Point(143,164),Point(147,157),Point(151,151),Point(155,144),Point(161,137),Point(165,131),Point(171,122),Point(174,118),Point(176,114),Point(177,112),Point(177,114),Point(175,116),Point(173,118)]
+}
 
-def _scale_to(points: list[Point], size: int) -> list[Point]:
-  new_points: list[Point] = []
-  b = _bounding_box(points=points)
-  b_width = abs(b[1].x - b[0].x)
-  b_height = abs(b[1].y - b[0].y)
+class Recogniser:
 
-  for p in points:
-    q_x = p.x * (size / b_width)
-    q_y = p.y * (size / b_height)
+  def __init__(self, use_predefined_templates: bool=True, matcher: str=Matcher.GOLDEN_SECTION, prune: bool=True, shortlist_size: int=None, template_store: str=None, profiler: Profiler=None, direction: str=Direction.MIRRORED_TEMPLATES) -> None:
+    '''
+      direction: how both draw directions of a gesture are recognised. Direction.MIRRORED_QUERY keeps one copy of every template and matches the query and its mirror against it, which halves the template memory and the lower bounds; the results are the same as with the mirrored templates, only the template of a mirrored match is the one as drawn.
+      profiler: if set, the time of each stage and the distance evaluations of every recognised stroke are recorded, see Profiler.
+      shortlist_size: if set, a kd-tree over the converted templates returns the shortlist_size nearest templates of a query and only those are scored by the matcher. smaller values are faster but may miss the template the full scan would find.
+      template_store: path of a file written by save_templates. if it exists and was built with the current Config and direction, the templates are loaded from it. otherwise the predefined templates are built and the store is (re)written; without use_predefined_templates, a stale store raises a ValueError and a missing one is not created.
+    '''
+    if matcher not in (Matcher.GOLDEN_SECTION, Matcher.PROTRACTOR):
+      raise ValueError(f"unknown matcher: {matcher}")
+
+    if direction not in (Direction.MIRRORED_TEMPLATES, Direction.MIRRORED_QUERY):
+      raise ValueError(f"unknown direction: {direction}")
+
+    self.matcher = matcher
+    self.direction = direction
+    self.prune = prune
+    self.shortlist_size = shortlist_size
+    self.profiler = profiler
+    self._index = None
+    #statistics of the lower bound pruning of single queries
+    self.compared_count = 0
+    self.pruned_count = 0
+    self.templates: list[Template] = []
+    #converted points of all templates stacked into one contiguous (T, SAMPLE_POINTS, 2) array; the buffer grows by doubling so that adding templates stays cheap
+    self._template_buffer = np.empty((0, Config.SAMPLE_POINTS, 2), dtype=float)
+    #the same templates as normalised protractor vectors
+    self._vector_buffer = np.empty((0, Config.SAMPLE_POINTS, 2), dtype=float)
 
-    new_points.append(Point(q_x, q_y))
-  
-  return new_points
+    if template_store is not None and self.load_templates(template_store):
+      return
+
+    #only a store of the predefined templates can be rebuilt; any other store (e.g. of condense_templates.py) is never overwritten
+    if template_store is not None and not use_predefined_templates and os.path.isfile(template_store):
+      raise ValueError(f"template store {template_store} was written with other Config parameters or another direction mode and cannot be rebuilt without the predefined templates")
+
+    if use_predefined_templates:
+      for key, value in predefined_gestures.items():
+        self.add_template(key, value)
 
-def _translate_to(points: list[Point], origin: Point) -> list[Point]:
-  new_points: list[Point] = []
-  c = _centroid(points=points)
+      if template_store is not None:
+        self.save_templates(template_store)
 
-  for p in points:
-    q_x = p.x + origin.x - c.x
-    q_y = p.y + origin.y - c.y
+  @property
+  def template_points(self) -> np.ndarray:
+    return self._template_buffer[:len(self.templates)]
 
-    new_points.append(Point(q_x, q_y))
+  @property
+  def template_vectors(self) -> np.ndarray:
+    return self._vector_buffer[:len(self.templates)]
 
-  return new_points
+  def _append_template_points(self, points: np.ndarray) -> None:
+    count = len(self.templates)
 
-def _path_distance(points: list[Point], template: list[Point]) -> float:
-  d = 0.0
-  
-  #https://stackoverflow.com/a/1663826/13620136
-  for (p, t) in zip(points, template):
-    d = d + _distance(p, t)
+    if count == len(self._template_buffer):
+      capacity = max(2 * count, 16)
 
-  return d / len(points)
+      for attribute in ("_template_buffer", "_vector_buffer"):
+        buffer = np.empty((capacity, Config.SAMPLE_POINTS, 2), dtype=float)
+        buffer[:count] = getattr(self, attribute)[:count]
+        setattr(self, attribute, buffer)
 
-def _distance_at_angle(points: list[Point], template: list[Point], theta: float) -> float:
-  new_points = _rotate_by(points, theta)
-  d = _path_distance(new_points, template)
+    self._template_buffer[count] = points
+    self._vector_buffer[count] = _vectorize(points)
 
-  return d
+  def _shortlist(self, points: np.ndarray) -> Union[np.ndarray, None]:
+    '''
+      returns the sorted indices of the shortlist_size nearest templates, (k,) for a query or (Q, k) for a batch, or None if all templates are scored. the kd-tree is rebuilt lazily after add_template.
+      with Direction.MIRRORED_QUERY, the query and its mirror are both looked up and the k templates nearest to either of them are returned.
+    '''
+    if self.shortlist_size is None or self.shortlist_size >= len(self.templates):
+      return None
 
-def _distance_at_best_angle(points: list[Point], template: Template, phi: float, theta_neg: float, theta_pos: float, theta_delta: float) -> float:
-  x_1 = phi * theta_neg + (1.0 - phi) * theta_pos
-  f_1 = _distance_at_angle(points, template.points, x_1)
+    if self._index is None:
+      #scikit-learn is only imported when a shortlist is requested
+      from sklearn.neighbors import KDTree
+      self._index = KDTree(self.template_points.reshape(len(self.templates), -1))
 
-  x_2 = (1.0 - phi) * theta_neg + phi * theta_pos
-  f_2 = _distance_at_angle(points, template.points, x_2)
+    if self.direction == Direction.MIRRORED_QUERY:
+      distances, candidates = self._index.query(_with_mirror(points).reshape(-1, Config.SAMPLE_POINTS * 2), k=self.shortlist_size)
+      rows = []
 
-  while abs(theta_pos - theta_neg) > theta_delta:
-    if f_1 < f_2:
-      theta_pos = x_2
-      x_2 = x_1
-      f_2 = f_1
-      x_1 = phi * theta_neg + (1.0 - phi) * theta_pos
-      f_1 = _distance_at_angle(points, template.points, x_1)
+      #each direction finds k different templates, so the merged neighbours of a query always contain k different ones
+      for (row_distances, row_candidates) in zip(distances.reshape(-1, 2 * self.shortlist_size), candidates.reshape(-1, 2 * self.shortlist_size)):
+        nearest = row_candidates[np.argsort(row_distances, kind="stable")]
+        _, first = np.unique(nearest, return_index=True)
+        rows.append(nearest[np.sort(first)[:self.shortlist_size]])
 
+      candidates = np.stack(rows)
     else:
-      theta_neg = x_1
-      x_1 = x_2
-      f_1 = f_2
-      x_2 = (1.0 - phi) * theta_neg + phi * theta_pos
-      f_2 = _distance_at_angle(points, template.points, x_2)
+      _, candidates = self._index.query(points.reshape(-1, Config.SAMPLE_POINTS * 2), k=self.shortlist_size)
 
-  return min(f_1, f_2)
+    candidates = np.sort(candidates, axis=-1)
 
-def _convert_points(points: list[Point]) -> list[Point]:
-    points = _resample(points, Config.SAMPLE_POINTS)
-    rad = _indicative_angle(points)
-    points = _rotate_by(points, -rad)
-    points = _scale_to(points, Config.SIZE)
-    points = _translate_to(points, Config.ORIGIN)
+    return candidates[0] if points.ndim == 2 else candidates
 
-    return points
+  def _match_golden_section(self, points: np.ndarray, candidates: np.ndarray=None) -> tuple[np.ndarray, np.ndarray]:
+    templates = self.template_points if candidates is None else self.template_points[candidates]
+    mirrored = self.direction == Direction.MIRRORED_QUERY
 
-def _mirror_points(points: list[Point]) -> list[Point]:
-  new_points = []
-  for p in points:
-    new_points.append(Point(-1 * p.x, p.y))
+    if mirrored:
+      points = _with_mirror(points)
+      #the shortlist of a query is shared by both directions
+      if candidates is not None:
+        templates = templates[..., np.newaxis, :, :, :]
 
-  return new_points
+    evaluations = None if self.profiler is None else np.zeros(points.shape[:-2] + (templates.shape[-3],), dtype=np.int64)
+    distances = _distances_at_best_angle(points, templates, Config.PHI, Config.THETA_NEG, Config.THETA_POS, Config.THETA_DELTA, evaluations)
 
-def _evaluate_list(points: list[Point]) -> bool:
-  if len(points) <= Config.REQUIRED_POINTS:
-    return False
-  
-  p_min, p_max = _bounding_box(points)
+    if mirrored:
+      distances = distances.min(axis=-2)
+      evaluations = None if evaluations is None else evaluations.sum(axis=-2)
 
-  if p_min.x == p_max.x or p_min.y == p_max.y:
-    return False
-  
-  return True
+    if evaluations is not None:
+      self.profiler.count_evaluations(np.arange(len(self.templates)) if candidates is None else candidates, evaluations)
+    #argmin returns the first minimum just like the strict comparison in the original loop
+    best = np.argmin(distances, axis=-1)[..., np.newaxis]
+    d = np.take_along_axis(distances, best, axis=-1)[..., 0]
 
-predefined_gestures: dict[str, list[Point]] = {
-  "triangle": [Point(137,139),Point(135,141),Point(133,144),Point(132,146),Point(130,149),Point(128,151),Point(126,155),Point(123,160),Point(120,166),Point(116,171),Point(112,177),Point(107,183),Point(102,188),Point(100,191),Point(95,195),Point(90,199),Point(86,203),Point(82,206),Point(80,209),Point(75,213),Point(73,213),Point(70,216),Point(67,219),Point(64,221),Point(61,223),Point(60,225),Point(62,226),Point(65,225),Point(67,226),Point(74,226),Point(77,227),Point(85,229),Point(91,230),Point(99,231),Point(108,232),Point(116,233),Point(125,233),Point(134,234),Point(145,233),Point(153,232),Point(160,233),Point(170,234),Point(177,235),Point(179,236),Point(186,237),Point(193,238),Point(198,239),Point(200,237),Point(202,239),Point(204,238),Point(206,234),Point(205,230),Point(202,222),Point(197,216),Point(192,207),Point(186,198),Point(179,189),Point(174,183),Point(170,178),Point(164,171),Point(161,168),Point(154,160),Point(148,155),Point(143,150),Point(138,148),Point(136,148)],
-	
-  "x": [Point(87,142),Point(89,145),Point(91,148),Point(93,151),Point(96,155),Point(98,157),Point(100,160),Point(102,162),Point(106,167),Point(108,169),Point(110,171),Point(115,177),Point(119,183),Point(123,189),Point(127,193),Point(129,196),Point(133,200),Point(137,206),Point(140,209),Point(143,212),Point(146,215),Point(151,220),Point(153,222),Point(155,223),Point(157,225),Point(158,223),Point(157,218),Point(155,211),Point(154,208),Point(152,200),Point(150,189),Point(148,179),Point(147,170),Point(147,158),Point(147,148),Point(147,141),Point(147,136),Point(144,135),Point(142,137),Point(140,139),Point(135,145),Point(131,152),Point(124,163),Point(116,177),Point(108,191),Point(100,206),Point(94,217),Point(91,222),Point(89,225),Point(87,226),Point(87,224)],
+    if candidates is not None:
+      best = np.take_along_axis(np.broadcast_to(candidates, distances.shape), best, axis=-1)
 
-  "rectangle": [Point(78,149),Point(78,153),Point(78,157),Point(78,160),Point(79,162),Point(79,164),Point(79,167),Point(79,169),Point(79,173),Point(79,178),Point(79,183),Point(80,189),Point(80,193),Point(80,198),Point(80,202),Point(81,208),Point(81,210),Point(81,216),Point(82,222),Point(82,224),Point(82,227),Point(83,229),Point(83,231),Point(85,230),Point(88,232),Point(90,233),Point(92,232),Point(94,233),Point(99,232),Point(102,233),Point(106,233),Point(109,234),Point(117,235),Point(123,236),Point(126,236),Point(135,237),Point(142,238),Point(145,238),Point(152,238),Point(154,239),Point(165,238),Point(174,237),Point(179,236),Point(186,235),Point(191,235),Point(195,233),Point(197,233),Point(200,233),Point(201,235),Point(201,233),Point(199,231),Point(198,226),Point(198,220),Point(196,207),Point(195,195),Point(195,181),Point(195,173),Point(195,163),Point(194,155),Point(192,145),Point(192,143),Point(192,138),Point(191,135),Point(191,133),Point(191,130),Point(190,128),Point(188,129),Point(186,129),Point(181,132),Point(173,131),Point(162,131),Point(151,132),Point(149,132),Point(138,132),Point(136,132),Point(122,131),Point(120,131),Point(109,130),Point(107,130),Point(90,132),Point(81,133),Point(76,133)],
+    return (best[..., 0], d)
 
-  "circle": [Point(127,141),Point(124,140),Point(120,139),Point(118,139),Point(116,139),Point(111,140),Point(109,141),Point(104,144),Point(100,147),Point(96,152),Point(93,157),Point(90,163),Point(87,169),Point(85,175),Point(83,181),Point(82,190),Point(82,195),Point(83,200),Point(84,205),Point(88,213),Point(91,216),Point(96,219),Point(103,222),Point(108,224),Point(111,224),Point(120,224),Point(133,223),Point(142,222),Point(152,218),Point(160,214),Point(167,210),Point(173,204),Point(178,198),Point(179,196),Point(182,188),Point(182,177),Point(178,167),Point(170,150),Point(163,138),Point(152,130),Point(143,129),Point(140,131),Point(129,136),Point(126,139)],
+  def _match_pruned(self, points: np.ndarray, candidates: np.ndarray=None) -> tuple[int, float]:
+    '''
+      templates are searched in the order of their lower bound, one block at a time. after each block, every template whose lower bound exceeds the best distance so far is skipped because its search cannot return a smaller distance.
+      with Direction.MIRRORED_QUERY, one bound per template holds for both directions, and both are searched for the templates of a block.
+    '''
+    if candidates is None:
+      candidates = np.arange(len(self.templates))
 
-  "check": [Point(91,185),Point(93,185),Point(95,185),Point(97,185),Point(100,188),Point(102,189),Point(104,190),Point(106,193),Point(108,195),Point(110,198),Point(112,201),Point(114,204),Point(115,207),Point(117,210),Point(118,212),Point(120,214),Point(121,217),Point(122,219),Point(123,222),Point(124,224),Point(126,226),Point(127,229),Point(129,231),Point(130,233),Point(129,231),Point(129,228),Point(129,226),Point(129,224),Point(129,221),Point(129,218),Point(129,212),Point(129,208),Point(130,198),Point(132,189),Point(134,182),Point(137,173),Point(143,164),Point(147,157),Point(151,151),Point(155,144),Point(161,137),Point(165,131),Point(171,122),Point(174,118),Point(176,114),Point(177,112),Point(177,114),Point(175,116),Point(173,118)]
-}
+    templates = self.template_points
+    mirrored = self.direction == Direction.MIRRORED_QUERY
 
-class Recogniser:
+    if mirrored:
+      bounds = _mirror_lower_bounds(points, templates[candidates])
+      queries = _with_mirror(points)
+    else:
+      bounds = _lower_bounds(points, templates[candidates])
+      queries = points
 
-  def __init__(self, use_predefined_templates: bool=True) -> None:
-    self.templates: list[Template] = []
+    order = np.argsort(bounds, kind="stable")
 
-    if use_predefined_templates:
-      for key, value in predefined_gestures.items():
-        self.add_template(key, value)
+    b = float("infinity")
+    best = -1
+    compared = 0
+
+    while len(order) > 0:
+      block = candidates[order[:Config.PRUNE_BLOCK]]
+      evaluations = None if self.profiler is None else np.zeros(queries.shape[:-2] + (len(block),), dtype=np.int64)
+      distances = _distances_at_best_angle(queries, templates[block], Config.PHI, Config.THETA_NEG, Config.THETA_POS, Config.THETA_DELTA, evaluations)
+      compared += len(block)
+
+      if mirrored:
+        distances = distances.min(axis=0)
+        evaluations = None if evaluations is None else evaluations.sum(axis=0)
+
+      if evaluations is not None:
+        self.profiler.count_evaluations(block, evaluations)
+
+      for (key, d) in zip(block, distances):
+        #on equal distances the lower index wins like in the exhaustive search
+        if d < b or (d == b and key < best):
+          b = float(d)
+          best = int(key)
+
+      order = order[Config.PRUNE_BLOCK:]
+      order = order[bounds[order] <= b + Config.PRUNE_EPSILON]
+
+    self.compared_count += compared
+    self.pruned_count += len(candidates) - compared
+
+    return (best, b)
+
+  @property
+  def pruning_rate(self) -> float:
+    total = self.compared_count + self.pruned_count
+
+    return self.pruned_count / total if total > 0 else 0.0
+
+  def _match_protractor(self, points: np.ndarray, candidates: np.ndarray=None) -> tuple[np.ndarray, np.ndarray]:
+    '''
+      the template is chosen by the highest cosine similarity. only for the winner, the path distance at its optimal angle is computed so that the score is in the same range as the golden section search.
+      with Direction.MIRRORED_QUERY, every template is compared with the query and its mirror and keeps the direction with the higher similarity.
+    '''
+    mirrored = self.direction == Direction.MIRRORED_QUERY
+    vectors = _vectorize(_with_mirror(points) if mirrored else points)
+
+    if candidates is None:
+      angles, similarities = _optimal_angles(vectors, self.template_vectors)
+    else:
+      #every query of a batch has its own shortlist, so the dot products are taken per row
+      templates = self.template_vectors[candidates]
+
+      if mirrored:
+        templates = templates[..., np.newaxis, :, :, :]
+
+      a = np.einsum("...nk,...tnk->...t", vectors, templates)
+      b = np.einsum("...n,...tn->...t", vectors[..., 0], templates[..., 1]) - np.einsum("...n,...tn->...t", vectors[..., 1], templates[..., 0])
+      angles, similarities = (np.arctan2(b, a), np.hypot(a, b))
+
+    if mirrored:
+      directions = np.argmax(similarities, axis=-2)[..., np.newaxis, :]
+      angles = np.take_along_axis(angles, directions, axis=-2)[..., 0, :]
+      similarities = np.take_along_axis(similarities, directions, axis=-2)[..., 0, :]
+
+    best = np.argmax(similarities, axis=-1)[..., np.newaxis]
+    angle = np.take_along_axis(angles, best, axis=-1)
+
+    if mirrored:
+      #the winner is scored in its direction
+      flip = np.take_along_axis(directions[..., 0, :], best, axis=-1)[..., np.newaxis]
+      points = np.where(flip == 1, points * (-1.0, 1.0), points)
+
+    if candidates is not None:
+      best = np.take_along_axis(np.broadcast_to(candidates, similarities.shape), best, axis=-1)
 
-  def recognise(self, points: list[Point]) -> tuple[Template, float]:
+    best = best[..., 0]
+    d = _distances_at_angles(points, self.template_points[best][..., np.newaxis, :, :], angle)
+
+    if self.profiler is not None:
+      #only the winner is scored at an angle
+      self.profiler.count_evaluations(best[..., np.newaxis], np.ones(best.shape + (1,), dtype=np.int64))
+
+    return (best, d[..., 0])
+
+  def _match(self, points: np.ndarray, candidates: np.ndarray=None) -> tuple[np.ndarray, np.ndarray]:
+    if self.matcher == Matcher.PROTRACTOR:
+      return self._match_protractor(points, candidates)
+
+    return self._match_golden_section(points, candidates)
+
+  def _search(self, points: np.ndarray) -> tuple[int, float]:
+    candidates = self._shortlist(points)
+
+    if self.prune and self.matcher == Matcher.GOLDEN_SECTION:
+      return self._match_pruned(points, candidates)
+
+    return self._match(points, candidates)
+
+  def recognise(self, points: Union[list[Point], Stroke]) -> tuple[Template, float]:
     '''
       important note: length of list must be 2 or greater although it makes no sense to evaluate a path with 2 points. also the points must differentiate in x-axis and y-axis. e.g. point(10,10) and point(10,10) are not allowed because it results in a 0 length bounding box, throwing a division by zero error.
+      a Stroke that was filled while drawing skips most of the preprocessing.
     '''
-    if not _evaluate_list(points):
-      return (None, None)
+    points = _prepare(points) if self.profiler is None else _prepare_profiled(points, self.profiler)
 
-    points = _convert_points(points)
+    if points is None:
+      return (None, None)
 
     b = float("infinity")
     found_template: Template = None
 
-    for template in self.templates:
-      d = _distance_at_best_angle(points, template, Config.PHI, Config.THETA_NEG, Config.THETA_POS, Config.THETA_DELTA)
+    if len(self.templates) > 0:
+      if self.profiler is None:
+        best, d = self._search(points)
+      else:
+        with self.profiler.stage("match"):
+          best, d = self._search(points)
+        self.profiler.end_queries()
 
-      if d < b:
-        b = d
-        found_template = template
+      b = float(d)
+      found_template = self.templates[int(best)]
 
     score = 1.0 - (b / Config.HALF_DIAGONAL)
     
     return (found_template, score)
 
+  def recognise_many(self, strokes: list[Union[list[Point], Stroke]], processes: int=None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+      recognises a whole batch of strokes. returns the template indices, template names and scores as arrays in the order of strokes. strokes that do not pass _is_valid get index -1, name None and score nan.
+      with processes set, the batch is split into chunks that are recognised in a process pool.
+    '''
+    if processes is not None and processes > 1 and len(strokes) > 1:
+      size = math.ceil(len(strokes) / processes)
+      chunks = [strokes[i:i + size] for i in range(0, len(strokes), size)]
+
+      with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self,)) as executor:
+        results = list(executor.map(_recognise_chunk, chunks))
+
+      return tuple(np.concatenate(r) for r in zip(*results))
+
+    indices = np.full(len(strokes), -1, dtype=int)
+    names = np.full(len(strokes), None, dtype=object)
+    scores = np.full(len(strokes), np.nan, dtype=float)
+
+    if len(self.templates) == 0:
+      return (indices, names, scores)
+
+    prepared = [_prepare(points) if self.profiler is None else _prepare_profiled(points, self.profiler) for points in strokes]
+    valid = np.array([key for (key, points) in enumerate(prepared) if points is not None], dtype=int)
+
+    if len(valid) == 0:
+      return (indices, names, scores)
+
+    queries = np.stack([prepared[key] for key in valid])
+    directions = 2 if self.direction == Direction.MIRRORED_QUERY else 1
+    size = max(1, Config.BATCH_ELEMENTS // (directions * min(len(self.templates), self.shortlist_size or len(self.templates)) * Config.SAMPLE_POINTS))
+
+    for start in range(0, len(valid), size):
+      batch = queries[start:start + size]
+
+      if self.profiler is None:
+        best, d = self._match(batch, self._shortlist(batch))
+      else:
+        with self.profiler.stage("match"):
+          best, d = self._match(batch, self._shortlist(batch))
+        self.profiler.end_queries()
+      keys = valid[start:start + size]
+
+      indices[keys] = best
+      scores[keys] = 1.0 - (d / Config.HALF_DIAGONAL)
+
+    template_names = np.array([t.name for t in self.templates], dtype=object)
+    names[valid] = template_names[indices[valid]]
+
+    return (indices, names, scores)
+
   def add_template(self, name: str, points: list[Point]) -> bool:
     '''
-      adding _mirror_points which mirrors all points along the x-axis so that you avoid the 1$ recogniser limitation where only one draw direction for a gesture works
+      adding the converted points mirrored along the x-axis as second template so that you avoid the 1$ recogniser limitation where only one draw direction for a gesture works. with Direction.MIRRORED_QUERY, the query is mirrored instead and only the converted points are added.
     '''
-    if not _evaluate_list(points):
+    converted_points = _prepare(points)
+
+    if converted_points is None:
       return False
 
-    converted_points = _convert_points(points)
-    mirrored_points = _mirror_points(converted_points)
+    if self.direction == Direction.MIRRORED_QUERY:
+      self._index = None
+      self._append_template_points(converted_points)
+      self.templates.append(Template(len(self.templates), name, converted_points))
+
+      return True
+
+    mirrored_points = converted_points * (-1.0, 1.0)
+    self._index = None
     
     template = Template(len(self.templates), name, converted_points)
-    mirrored_template = Template(len(self.templates)+1, name, mirrored_points)
-
+    self._append_template_points(converted_points)
     self.templates.append(template)
+
+    mirrored_template = Template(len(self.templates), name, mirrored_points)
+    self._append_template_points(mirrored_points)
     self.templates.append(mirrored_template)
     
-    return True
\ No newline at end of file
+    return True
+
+  def save_templates(self, path: str) -> None:
+    '''
+      writes the converted templates to an uncompressed npz file together with the Config parameters they were converted with and the direction mode.
+    '''
+    with open(path, "wb") as f:
+      np.savez(
+        f,
+        config=_store_key(self.direction),
+        points=self.template_points,
+        names=np.array([t.name for t in self.templates], dtype=str),
+        indices=np.array([t.index for t in self.templates], dtype=int)
+      )
+
+  def load_templates(self, path: str) -> bool:
+    '''
+      replaces the templates with the ones of a store written by save_templates. returns False if the file does not exist or was written with different Config parameters or another direction mode, in which case the store is stale and needs to be rebuilt.
+    '''
+    if not os.path.isfile(path):
+      return False
+
+    with np.load(path) as store:
+      if not np.array_equal(store["config"], _store_key(self.direction)):
+        return False
+
+      points = store["points"]
+      names = store["names"]
+      indices = store["indices"]
+
+    self.templates = [Template(int(index), str(name), points[key]) for (key, (index, name)) in enumerate(zip(indices, names))]
+    self._template_buffer = points
+    self._vector_buffer = _vectorize(points)
+    self._index = None
+
+    return True
+
+def _store_key(direction: str) -> np.ndarray:
+  return np.array([Config.SAMPLE_POINTS, Config.SIZE, Config.ORIGIN.x, Config.ORIGIN.y, direction == Direction.MIRRORED_QUERY], dtype=float)
+
+_worker_recogniser: Recogniser = None
+
+def _init_worker(recogniser: Recogniser) -> None:
+  global _worker_recogniser
+  _worker_recogniser = recogniser
+
+def _recognise_chunk(strokes: list[Union[list[Point], Stroke]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  return _worker_recogniser.recognise_many(strokes)
@@ -0,0 +1,85 @@
+# common interface of the recognisers and a cascade of a fast and an accurate recogniser
+import time
+from typing import Protocol, Union
+
+import numpy as np
+
+from recognizer import Point, Stroke, Template
+
+class CascadeConfig:
+  #$1 scores (1 - distance / half diagonal) below the threshold are escalated; see the README for the calibration on dataset/test
+  THRESHOLD = 0.8
+
+
+class RecogniserBackend(Protocol):
+  '''
+    what the applications and the RecognitionWorker need from a recogniser: Recogniser, LSTMRecogniser and CascadeRecogniser.
+    recognise returns (None, None) if the stroke cannot be recognised; recognise_many returns index -1, name None and score nan for such strokes.
+  '''
+
+  def recognise(self, points: Union[list[Point], Stroke]) -> tuple[Template, float]:
+    ...
+
+  def recognise_many(self, strokes: list[Union[list[Point], Stroke]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ...
+
+
+class CascadeRecogniser:
+  '''
+    the fast recogniser answers if its score is at least threshold. otherwise, or if it cannot recognise the stroke, the stroke is escalated to the accurate recogniser and its answer is returned.
+    the scores of both recognisers are returned as they are, so the score of an answer depends on the recogniser that gave it. the same applies to the template indices of recognise_many.
+  '''
+
+  def __init__(self, fast: RecogniserBackend, accurate: RecogniserBackend, threshold: float=CascadeConfig.THRESHOLD) -> None:
+    self.fast = fast
+    self.accurate = accurate
+    self.threshold = threshold
+
+    self.query_count = 0
+    self.escalated_count = 0
+    #seconds spent in each recogniser
+    self.fast_time = 0.0
+    self.accurate_time = 0.0
+
+  @property
+  def escalation_rate(self) -> float:
+    return self.escalated_count / self.query_count if self.query_count > 0 else 0.0
+
+  def recognise(self, points: Union[list[Point], Stroke]) -> tuple[Template, float]:
+    t1 = time.perf_counter()
+    result = self.fast.recognise(points)
+    t2 = time.perf_counter()
+
+    self.query_count += 1
+    self.fast_time += t2 - t1
+
+    if result[0] is not None and result[1] >= self.threshold:
+      return result
+
+    result = self.accurate.recognise(points)
+
+    self.escalated_count += 1
+    self.accurate_time += time.perf_counter() - t2
+
+    return result
+
+  def recognise_many(self, strokes: list[Union[list[Point], Stroke]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    t1 = time.perf_counter()
+    indices, names, scores = self.fast.recognise_many(strokes)
+    t2 = time.perf_counter()
+
+    #nan scores of strokes the fast recogniser cannot recognise are escalated as well
+    escalated = np.flatnonzero(~(scores >= self.threshold))
+
+    self.query_count += len(strokes)
+    self.fast_time += t2 - t1
+
+    if len(escalated) == 0:
+      return (indices, names, scores)
+
+    indices[escalated], names[escalated], scores[escalated] = self.accurate.recognise_many([strokes[key] for key in escalated])
+
+    self.escalated_count += len(escalated)
+    self.accurate_time += time.perf_counter() - t2
+
+    return (indices, names, scores)
@@ -0,0 +1,183 @@
+# replays a session recorded with gesture-application.py --record without a display: python replay_session.py session.npz [--speed 1.0] [--no-draw] [--output results.json]
+import os, json, time, random, argparse, importlib.util
+from typing import Callable
+
+import numpy as np
+import pyglet
+
+#the options have to be set before the window and media modules are loaded. pyglet 2.0 only creates a headless window from a config that names the opengl api, which the shadow window does not
+pyglet.options["headless"] = True
+pyglet.options["shadow_window"] = False
+pyglet.options["audio"] = ("silent",)
+
+from pyglet import clock, gl
+
+from session_recorder import EventType, Session, load_session
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class ReplayConfig:
+  #seconds the replay goes on after the last event so that the last result and the timelines it starts are handled
+  TAIL = 3.0
+  #seconds to wait for the recognition of an event before the replay fails
+  WORKER_TIMEOUT = 10.0
+  STAGES = ["on_mouse_press", "on_mouse_drag", "on_mouse_release", "recognise", "handle_gesture", "_check_collision", "frame"]
+
+
+class VirtualTime:
+  '''
+    time function of the pyglet clock during a replay; only the replay moves it forward.
+  '''
+
+  def __init__(self) -> None:
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+def _load_application():
+  #the dash in the file name does not allow a normal import
+  spec = importlib.util.spec_from_file_location("gesture_application", os.path.join(SCRIPT_DIR, "gesture-application.py"))
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+
+  return module
+
+def _timed(samples: list[float], function: Callable) -> Callable:
+  def timed(*args, **kwargs):
+    t1 = time.perf_counter()
+
+    try:
+      return function(*args, **kwargs)
+    finally:
+      samples.append(time.perf_counter() - t1)
+
+  return timed
+
+def _summary(samples: list[float]) -> dict:
+  if len(samples) == 0:
+    return {"count": 0}
+
+  p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+
+  return {"count": len(samples), "mean": float(np.mean(samples)), "p50": float(p50), "p95": float(p95), "p99": float(p99), "max": float(np.max(samples))}
+
+def replay(session: Session, speed: float=None, draw: bool=True) -> dict:
+  '''
+    feeds the events of the session into the handlers of an Application with a headless window and a silent audio driver. the pyglet clock runs on virtual time that advances frame by frame (Application.FPS) and jumps to every event, so the polling of the results and the timelines of the game run like in the session.
+    with speed set, virtual time runs speed times as fast as real time; otherwise the replay runs as fast as possible. after every event, the replay waits until the RecognitionWorker is idle, so the game follows the same path on every machine.
+    returns the number of events and frames, the virtual and the real duration and the latency of every stage in seconds.
+  '''
+  module = _load_application()
+  virtual = VirtualTime()
+  clock.set_default(clock.Clock(time_function=virtual))
+  #the same cards and sequence as in the session
+  random.seed(session.seed)
+
+  application = module.Application(gl.Config(double_buffer=True, opengl_api="gl"))
+
+  if (application.window.width, application.window.height) != session.size:
+    raise ValueError(f"session was recorded with a {session.size[0]}x{session.size[1]} window, the application has {application.window.width}x{application.window.height}")
+
+  samples = {stage: [] for stage in ReplayConfig.STAGES}
+  application.recogniser.recognise = _timed(samples["recognise"], application.recogniser.recognise)
+
+  def instrument(game) -> None:
+    game._check_collision = _timed(samples["_check_collision"], game._check_collision)
+    game.handle_gesture = _timed(samples["handle_gesture"], game.handle_gesture)
+
+  #a reload gesture replaces the game
+  init = application._init
+
+  def reload() -> None:
+    init()
+    instrument(application.game)
+
+  application._init = reload
+  instrument(application.game)
+
+  handlers = {
+    EventType.PRESS: ("on_mouse_press", application.on_mouse_press),
+    EventType.DRAG: ("on_mouse_drag", application.on_mouse_drag),
+    EventType.RELEASE: ("on_mouse_release", application.on_mouse_release)
+  }
+  on_draw = _timed(samples["frame"], application.on_draw)
+  frame_count = 0
+  start = time.perf_counter()
+
+  def advance(target: float) -> None:
+    nonlocal frame_count
+
+    #frames are due every Application.FPS seconds independent of the events; every frame runs the scheduled functions that are due and draws the batch, like app.run does
+    while (frame_count + 1) * application.FPS <= target:
+      frame_count += 1
+      virtual.now = frame_count * application.FPS
+
+      if speed is not None:
+        time.sleep(max(0.0, start + virtual.now / speed - time.perf_counter()))
+
+      clock.tick()
+
+      if draw:
+        on_draw()
+
+    virtual.now = max(virtual.now, target)
+
+  previous = (0, 0)
+  event_count = 0
+
+  for (event_type, t, (x, y), buttons, modifiers) in zip(session.types.tolist(), session.times.tolist(), session.positions.tolist(), session.buttons.tolist(), session.modifiers.tolist()):
+    advance(t)
+    name, handler = handlers[event_type]
+    arguments = (x, y, x - previous[0], y - previous[1], buttons, modifiers) if event_type == EventType.DRAG else (x, y, buttons, modifiers)
+
+    t1 = time.perf_counter()
+    handler(*arguments)
+    samples[name].append(time.perf_counter() - t1)
+
+    previous = (x, y)
+    event_count += 1
+
+    if not application.worker.wait(ReplayConfig.WORKER_TIMEOUT):
+      raise RuntimeError(f"recognition of event {event_count} did not finish within {ReplayConfig.WORKER_TIMEOUT}s")
+
+    #the exit gesture ends the session
+    if pyglet.app.event_loop.has_exit:
+      break
+
+  advance(virtual.now + ReplayConfig.TAIL)
+  wall = time.perf_counter() - start
+
+  application.worker.stop()
+  application.window.close()
+
+  return {
+    "events": event_count,
+    "frames": frame_count,
+    "duration": virtual.now,
+    "wall": wall,
+    "stages": {stage: _summary(samples[stage]) for stage in ReplayConfig.STAGES}
+  }
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="replays a recorded session of gesture-application.py headless and reports the latency of every stage")
+  parser.add_argument("session", help="file written by gesture-application.py --record")
+  parser.add_argument("--speed", type=float, help="run virtual time SPEED times as fast as real time (1 is real time); as fast as possible if not set")
+  parser.add_argument("--no-draw", action="store_true", help="do not draw the frames")
+  parser.add_argument("--output", help="write the results as json")
+  args = parser.parse_args()
+
+  results = replay(load_session(args.session), args.speed, not args.no_draw)
+
+  print(f"replayed {results['events']} events and {results['frames']} frames of {results['duration']:.1f}s in {results['wall']:.2f}s: {results['events'] / results['wall']:.0f} events/s, {results['duration'] / results['wall']:.1f}x real time")
+
+  for (stage, summary) in results["stages"].items():
+    if summary["count"] == 0:
+      continue
+
+    print(f"{stage:<18} {summary['count']:>7} calls  p50 {summary['p50'] * 1000:8.3f}ms  p95 {summary['p95'] * 1000:8.3f}ms  p99 {summary['p99'] * 1000:8.3f}ms  max {summary['max'] * 1000:8.3f}ms")
+
+  if args.output is not None:
+    with open(args.output, "w") as f:
+      json.dump(results, f, indent=2)
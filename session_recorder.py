@@ -0,0 +1,116 @@
+# records the mouse input of a gesture-application.py session so that replay_session.py can play it again
+import random
+from typing import TYPE_CHECKING
+
+import numpy as np
+from pyglet.clock import get_default
+
+#only for the annotation; importing pyglet.window at runtime opens the display
+if TYPE_CHECKING:
+  from pyglet.window import Window
+
+class EventType:
+  PRESS = 0
+  DRAG = 1
+  RELEASE = 2
+
+
+class Session:
+  '''
+    the events of a session in columns: type, time in seconds since the application started, position, buttons and modifiers. seed is the seed of random the game was created with and size the size of the window.
+  '''
+
+  def __init__(self, seed: int, size: tuple[int, int], types: np.ndarray, times: np.ndarray, positions: np.ndarray, buttons: np.ndarray, modifiers: np.ndarray) -> None:
+    self.seed = seed
+    self.size = size
+    self.types = types
+    self.times = times
+    self.positions = positions
+    self.buttons = buttons
+    self.modifiers = modifiers
+
+  def __len__(self) -> int:
+    return len(self.types)
+
+  @property
+  def duration(self) -> float:
+    return float(self.times[-1]) if len(self.times) > 0 else 0.0
+
+
+def save_session(session: Session, path: str) -> None:
+  with open(path, "wb") as f:
+    np.savez_compressed(
+      f,
+      seed=np.array(session.seed, dtype=np.uint64),
+      size=np.array(session.size, dtype=np.int32),
+      types=session.types.astype(np.uint8),
+      times=session.times.astype(np.float64),
+      positions=session.positions.astype(np.int32),
+      buttons=session.buttons.astype(np.uint8),
+      modifiers=session.modifiers.astype(np.uint16)
+    )
+
+def load_session(path: str) -> Session:
+  with np.load(path) as f:
+    return Session(int(f["seed"]), tuple(int(v) for v in f["size"]), f["types"], f["times"], f["positions"], f["buttons"], f["modifiers"])
+
+
+class SessionRecorder:
+  '''
+    records the mouse events of a window with handlers pushed on top of the handlers of the application. the handlers return nothing, so every event still reaches the application. times are taken from the default pyglet clock like the application does.
+    the game draws its cards and its sequence with random, so the recorder seeds random when it is created (before the application) and keeps the seed.
+  '''
+
+  def __init__(self, seed: int=None) -> None:
+    self.seed = random.randrange(2 ** 32) if seed is None else seed
+    random.seed(self.seed)
+
+    self.size = (0, 0)
+    self._start = 0.0
+    self._types: list[int] = []
+    self._times: list[float] = []
+    self._positions: list[tuple[int, int]] = []
+    self._buttons: list[int] = []
+    self._modifiers: list[int] = []
+
+  def __len__(self) -> int:
+    return len(self._types)
+
+  def attach(self, window: "Window") -> None:
+    '''
+      starts the recording; the time of the events is counted from here.
+    '''
+    self.size = (window.width, window.height)
+    self._start = get_default().time()
+    window.push_handlers(on_mouse_press=self.on_mouse_press, on_mouse_drag=self.on_mouse_drag, on_mouse_release=self.on_mouse_release)
+
+  def _add(self, event_type: int, x: int, y: int, buttons: int, modifiers: int) -> None:
+    self._types.append(event_type)
+    self._times.append(get_default().time() - self._start)
+    self._positions.append((x, y))
+    self._buttons.append(buttons)
+    self._modifiers.append(modifiers)
+
+  def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
+    self._add(EventType.PRESS, x, y, button, modifiers)
+
+  def on_mouse_drag(self, x: int, y: int, dx: int, dy: int, buttons: int, modifiers: int) -> None:
+    #dx and dy follow from the positions of the previous events
+    self._add(EventType.DRAG, x, y, buttons, modifiers)
+
+  def on_mouse_release(self, x: int, y: int, button: int, modifiers: int) -> None:
+    self._add(EventType.RELEASE, x, y, button, modifiers)
+
+  def session(self) -> Session:
+    return Session(
+      self.seed,
+      self.size,
+      np.array(self._types, dtype=np.uint8),
+      np.array(self._times, dtype=np.float64),
+      np.array(self._positions, dtype=np.int32).reshape(-1, 2),
+      np.array(self._buttons, dtype=np.uint8),
+      np.array(self._modifiers, dtype=np.uint16)
+    )
+
+  def save(self, path: str) -> None:
+    save_session(self.session(), path)
@@ -0,0 +1,46 @@
+# pooled rendering of the drawn stroke for both applications
+from pyglet.graphics import Batch, Group
+from pyglet.shapes import Circle
+
+
+class StrokeRenderer:
+  '''
+    draws the points of a stroke as circles in a pyglet batch, so the whole stroke is drawn together with the batch regardless of its length.
+    circles of a cleared stroke are hidden and reused for the next stroke instead of being created again. the first circle is the larger start circle.
+  '''
+
+  def __init__(self, batch: Batch, group: Group, radius_start: float, colour_start: tuple, radius: float, colour: tuple) -> None:
+    self.batch = batch
+    self.group = group
+    self.radius_start = radius_start
+    self.colour_start = colour_start
+    self.radius = radius
+    self.colour = colour
+
+    self._pool: list[Circle] = []
+    self._count = 0
+
+  def __len__(self) -> int:
+    return self._count
+
+  def add(self, x: int, y: int) -> None:
+    if self._count < len(self._pool):
+      circle = self._pool[self._count]
+      circle.position = (x, y)
+      circle.visible = True
+
+    elif self._count == 0:
+      circle = Circle(x=x, y=y, radius=self.radius_start, color=self.colour_start, batch=self.batch, group=self.group)
+      self._pool.append(circle)
+
+    else:
+      circle = Circle(x=x, y=y, radius=self.radius, color=self.colour, batch=self.batch, group=self.group)
+      self._pool.append(circle)
+
+    self._count += 1
+
+  def clear(self) -> None:
+    for circle in self._pool[:self._count]:
+      circle.visible = False
+
+    self._count = 0
@@ -0,0 +1,111 @@
+# preprocessed dataset folders for the lstm and the $1 evaluation of unistroke-gestures.ipynb, cached as memory mapped arrays
+import os, csv, hashlib
+
+import numpy as np
+
+from recognizer import Point
+
+SCRIPT_DIR = os.path.dirname(__file__)
+
+class DataConfig:
+  SAMPLE_POINTS = 50
+  CACHE_PATH = os.path.join(SCRIPT_DIR, ".cache")
+  #part of the cache key; increase it when the preprocessing changes
+  VERSION = 1
+
+
+def _find_files(path: str) -> list[str]:
+  '''
+    relative paths of the csv files of a dataset folder (one folder per class) in sorted order.
+  '''
+  sources = []
+
+  for (root, _, files) in os.walk(path):
+    for file_name in files:
+      if file_name.endswith(".csv"):
+        sources.append(os.path.relpath(os.path.join(root, file_name), path))
+
+  return sorted(sources)
+
+def _cache_key(path: str, sources: list[str], sample_points: int) -> str:
+  '''
+    hash of the names and contents of the csv files and of the preprocessing parameters.
+  '''
+  key = hashlib.sha1(f"{DataConfig.VERSION}:{sample_points}".encode())
+
+  for source in sources:
+    key.update(source.encode())
+
+    with open(os.path.join(path, source), "rb") as f:
+      content = f.read()
+
+    key.update(len(content).to_bytes(8, "little"))
+    key.update(content)
+
+  return key.hexdigest()
+
+def _read_points(path: str, columns: tuple[str, ...]=("x", "y")) -> np.ndarray:
+  with open(path) as f:
+    return np.array([tuple(float(row[column]) for column in columns) for row in csv.DictReader(f)], dtype=float).reshape(-1, len(columns))
+
+def load_strokes(path: str, columns: tuple[str, ...]=("x", "y")) -> list[tuple[str, np.ndarray]]:
+  '''
+    the label (name of the class folder) and the (N, len(columns)) values of every csv file of a dataset folder, sorted by label and file name. unlike load_dataset, the strokes are neither preprocessed nor cached.
+  '''
+  return [(os.path.dirname(source), _read_points(os.path.join(path, source), columns)) for source in _find_files(path)]
+
+def load_point_strokes(path: str) -> list[tuple[str, list[Point]]]:
+  '''
+    load_strokes with the points as Point lists, the input of Recogniser.add_template and recognise.
+  '''
+  return [(label, [Point(x, y) for (x, y) in points.tolist()]) for (label, points) in load_strokes(path)]
+
+def standardise(points: np.ndarray) -> np.ndarray:
+  #same as StandardScaler().fit_transform(points): population standard deviation, constant columns are only centred
+  scale = points.std(axis=0)
+  scale[scale == 0.0] = 1.0
+
+  return (points - points.mean(axis=0)) / scale
+
+def _preprocess(path: str, sources: list[str], sample_points: int) -> tuple[np.ndarray, np.ndarray]:
+  from scipy.signal import resample
+
+  strokes = [standardise(_read_points(os.path.join(path, source))) for source in sources]
+  labels = np.array([os.path.dirname(source) for source in sources], dtype=str)
+  points = np.empty((len(strokes), sample_points, 2), dtype=float)
+
+  #strokes with the same number of points are resampled in one call
+  lengths = np.array([len(stroke) for stroke in strokes], dtype=int)
+  for length in np.unique(lengths):
+    members = np.flatnonzero(lengths == length)
+    points[members] = resample(np.stack([strokes[i] for i in members]), sample_points, axis=1)
+
+  return (points, labels)
+
+def _save(path: str, array: np.ndarray) -> None:
+  #written to a temporary file first so that an interrupted run does not leave a broken cache behind
+  temporary = path + ".tmp"
+
+  with open(temporary, "wb") as f:
+    np.save(f, array)
+
+  os.replace(temporary, path)
+
+def load_dataset(path: str, sample_points: int=DataConfig.SAMPLE_POINTS, cache_path: str=DataConfig.CACHE_PATH) -> tuple[np.ndarray, np.ndarray]:
+  '''
+    returns the strokes of a dataset folder as (N, sample_points, 2) array and their class names, preprocessed like get_data of the notebook: every stroke is standardised (StandardScaler) and resampled to sample_points with scipy.signal.resample.
+    the first call with a given content of the folder and sample_points writes the arrays to cache_path; later calls map the cached files read-only (np.load with mmap_mode) instead of parsing the csv files again.
+  '''
+  sources = _find_files(path)
+  key = _cache_key(path, sources, sample_points)
+  points_path = os.path.join(cache_path, f"{key}-points.npy")
+  labels_path = os.path.join(cache_path, f"{key}-labels.npy")
+
+  if not (os.path.isfile(points_path) and os.path.isfile(labels_path)):
+    points, labels = _preprocess(path, sources, sample_points)
+
+    os.makedirs(cache_path, exist_ok=True)
+    _save(points_path, points)
+    _save(labels_path, labels)
+
+  return (np.load(points_path, mmap_mode="r"), np.load(labels_path, mmap_mode="r"))